@@ -0,0 +1,103 @@
+import hashlib
+from flask import current_app, jsonify, request, url_for
+from sqlalchemy import func, select
+from werkzeug.http import is_resource_modified
+from app import db
+from models import Donation
+from category_registry import categories
+from image_service import photo_url
+
+# Read-only JSON API behind /api. Payloads keep to the fixed field sets below
+# so clients are not coupled to the models. Every response carries an ETag and
+# Last-Modified derived from Donation.updated_at (a row version bumped by any
+# write) and approved_at, and conditional requests are answered with 304
+# before the listing query or serialization runs.
+
+API_VERSION = 1
+API_PER_PAGE = 12
+API_MAX_PER_PAGE = 50
+
+
+def _timestamp(value):
+    return value.isoformat() + 'Z' if value else None
+
+
+def _category(category_id):
+    return {'id': category_id, 'name': categories.name(category_id)}
+
+
+def donation_summary(donation):
+    """Fields for one donation in a listing"""
+    return {
+        'id': donation.id,
+        'title': donation.title,
+        'description': donation.description,
+        'category': _category(donation.category_id),
+        'approved_at': _timestamp(donation.approved_at),
+        'photo_url': photo_url(donation, 'card') if donation.photo_filename else None,
+        'url': url_for('api_donation', id=donation.id),
+        'html_url': url_for('item_detail', id=donation.id),
+    }
+
+
+def donation_detail(donation):
+    """Fields for the item page; the donation must be loaded with the donation_detail profile"""
+    return {
+        'id': donation.id,
+        'title': donation.title,
+        'description': donation.description,
+        'category': _category(donation.category_id),
+        'status': donation.status,
+        'donor': donation.donor.username,
+        'approved_by': donation.approved_by.username if donation.approved_by else None,
+        'created_at': _timestamp(donation.created_at),
+        'approved_at': _timestamp(donation.approved_at),
+        'donated_at': _timestamp(donation.donated_at),
+        'photo_url': photo_url(donation, 'detail') if donation.photo_filename else None,
+        'matches': [
+            {'request_title': match.request.title, 'status': match.status, 'created_at': _timestamp(match.created_at)}
+            for match in donation.matches
+        ],
+        'html_url': url_for('item_detail', id=donation.id),
+    }
+
+
+def listing_versions():
+    """(latest updated_at of any donation, latest approved_at of an approved one), in one indexed statement"""
+    latest_approval = select(func.max(Donation.approved_at)).where(Donation.status == 'approved').scalar_subquery()
+    return db.session.execute(select(func.max(Donation.updated_at), latest_approval)).one()
+
+
+def make_etag(*parts):
+    """Stable across workers: built only from data, never from per-process state"""
+    # Category names appear in payloads, so a rename changes every tag
+    source = repr((API_VERSION, categories.all()) + parts)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:32]
+
+
+def last_modified(*timestamps):
+    present = [value for value in timestamps if value]
+    return max(present) if present else None
+
+
+def conditional_json(etag, modified, build, public=True):
+    """jsonify(build()) unless the client's validators still match, in which case a bodyless 304"""
+    if is_resource_modified(request.environ, etag=etag, last_modified=modified):
+        response = jsonify(build())
+    else:
+        response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    if modified:
+        response.last_modified = modified
+    # Clients and proxies keep the body but revalidate every time
+    response.cache_control.no_cache = True
+    if public:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    return response
+
+
+def api_per_page(args):
+    per_page = args.get('per_page', API_PER_PAGE, type=int)
+    return min(max(per_page, 1), API_MAX_PER_PAGE)
@@ -7,9 +7,10 @@ from flask_wtf.csrf import CSRFProtect
 from flask_mail import Mail
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from db_profiles import default_profile, engine_options, install_engine_hooks
 
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
 
 class Base(DeclarativeBase):
     pass
@@ -26,15 +27,22 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
 # configure the database
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///donation_tracker.db")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+# engine profiles: 'sqlite-dev', 'sqlite-wal' (several workers on one file) or 'postgres-prod'
+app.config['DB_ENGINE_PROFILE'] = os.environ.get('DB_ENGINE_PROFILE') or default_profile(app.config["SQLALCHEMY_DATABASE_URI"])
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"], app.config['DB_ENGINE_PROFILE'], {
+    'pool_size': int(os.environ['DB_POOL_SIZE']) if os.environ.get('DB_POOL_SIZE') else None,
+    'max_overflow': int(os.environ['DB_MAX_OVERFLOW']) if os.environ.get('DB_MAX_OVERFLOW') else None,
+    'pool_timeout': int(os.environ['DB_POOL_TIMEOUT']) if os.environ.get('DB_POOL_TIMEOUT') else None,  # seconds
+    'statement_timeout_ms': int(os.environ['DB_STATEMENT_TIMEOUT_MS']) if os.environ.get('DB_STATEMENT_TIMEOUT_MS') else None,
+})
 
 # configure file uploads
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# static assets: run 'flask build-assets' to serve fingerprinted, immutable copies
+app.config['ASSET_PRECOMPRESSED'] = os.environ.get('ASSET_PRECOMPRESSED', 'false').lower() in ['true', 'on', '1']  # send built .br/.gz copies
+
 # configure mail
 app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
 app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', '587'))
@@ -43,12 +51,49 @@ app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@sistershare.org')
 
+# configure the outbound mail queue
+# 'thread' drains the outbox in a background thread per worker; 'worker' leaves it to `flask mail-worker`
+app.config['MAIL_DISPATCH_MODE'] = os.environ.get('MAIL_DISPATCH_MODE', 'thread')
+app.config['MAIL_BATCH_SIZE'] = int(os.environ.get('MAIL_BATCH_SIZE', '50'))
+app.config['MAIL_MAX_ATTEMPTS'] = int(os.environ.get('MAIL_MAX_ATTEMPTS', '5'))
+app.config['MAIL_RETRY_BACKOFF'] = int(os.environ.get('MAIL_RETRY_BACKOFF', '30'))  # seconds, doubled per attempt
+app.config['MAIL_POLL_INTERVAL'] = int(os.environ.get('MAIL_POLL_INTERVAL', '10'))  # seconds
+app.config['MAIL_CLAIM_TIMEOUT'] = int(os.environ.get('MAIL_CLAIM_TIMEOUT', '600'))  # seconds before a stuck send is retried
+
+# configure password hashing; stored hashes using other settings are upgraded at login
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')  # e.g. scrypt:16384:8:1, pbkdf2:sha256:600000
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', '0'))  # 0 hashes on the request thread
+app.config['PASSWORD_HASH_POOL'] = os.environ.get('PASSWORD_HASH_POOL', 'thread')  # 'thread' or 'process'
+
+# configure the page cache for anonymous visitors ('lru' per worker, 'redis' shared, 'null' off)
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'lru')
+app.config['CACHE_DEFAULT_TTL'] = int(os.environ.get('CACHE_DEFAULT_TTL', '60'))  # seconds
+app.config['CACHE_LRU_SIZE'] = int(os.environ.get('CACHE_LRU_SIZE', '1024'))
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', '60'))  # seconds a signed-in user snapshot is reused
+app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', '4096'))  # signed-in users kept per worker
+app.config['CATEGORY_CACHE_TTL'] = int(os.environ.get('CATEGORY_CACHE_TTL', '300'))  # seconds; fallback refresh for other workers
+
+# opt-in request/SQL instrumentation served at /metrics (see instrumentation.py)
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'false').lower() in ['true', 'on', '1']
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # bearer token required by /metrics when set
+app.config['N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('N_PLUS_ONE_THRESHOLD', '5'))  # identical SELECTs per request
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))  # share of requests profiled
+app.config['PROFILE_ENDPOINTS'] = [e for e in os.environ.get('PROFILE_ENDPOINTS', '').split(',') if e]  # empty = all
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'instance/profiles')
+
+# create and seed the schema when the app is created ('flask init-db' does this once per deployment)
+app.config['AUTO_INIT_DB'] = os.environ.get('AUTO_INIT_DB', 'false').lower() in ['true', 'on', '1']
+
 # initialize extensions
 db.init_app(app)
 login_manager.init_app(app)
 csrf.init_app(app)
 mail.init_app(app)
 
+with app.app_context():
+    install_engine_hooks(db.engine, app.config['DB_ENGINE_PROFILE'])
+
 # configure login manager
 login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
@@ -56,19 +101,32 @@ login_manager.login_message_category = 'info'
 
 @login_manager.user_loader
 def load_user(user_id):
-    from models import User
-    return User.query.get(int(user_id))
+    from user_cache import load_session_user
+    return load_session_user(int(user_id))
 
 # Create upload directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-with app.app_context():
-    # Make sure to import the models here or their tables won't be created
-    import models  # noqa: F401
-    import routes  # noqa: F401
-    
-    db.create_all()
-    
-    # Initialize default data after tables are created
-    from routes import create_default_data
-    create_default_data()
+# Register models, views and their hooks on the app
+import models  # noqa: F401,E402
+import routes  # noqa: F401,E402
+import user_cache  # noqa: F401,E402  (registers the snapshot invalidation hooks)
+import bootstrap  # noqa: F401,E402  (init-db and seed commands)
+import migrations  # noqa: F401,E402  (upgrade-schema command)
+import importer  # noqa: F401,E402  (import-donations and import-requests commands)
+import benchmark  # noqa: F401,E402  (bench-seed and bench commands)
+import assets  # noqa: F401,E402  (fingerprinted static URLs and build-assets command)
+import instrumentation  # noqa: F401,E402  (installs itself when METRICS_ENABLED)
+
+
+def create_app():
+    """Return the configured app; the schema is only touched when AUTO_INIT_DB is set"""
+    if app.config['AUTO_INIT_DB']:
+        with app.app_context():
+            bootstrap.init_database()
+    if app.config['MAIL_DISPATCH_MODE'] == 'thread':
+        # Start polling now rather than on the first commit that queues mail, so
+        # backoff retries and sends left stuck by a previous process still go out
+        from email_service import dispatcher
+        dispatcher.ensure_started(app)
+    return app
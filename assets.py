@@ -0,0 +1,166 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import click
+from flask import request, send_from_directory
+from app import app
+from storage import IMMUTABLE_MAX_AGE
+
+try:
+    import brotli
+except ImportError:  # optional; only .gz copies are written without it
+    brotli = None
+
+# Static asset pipeline. `flask build-assets` minifies CSS, copies every static
+# file to static/build/<name>.<content hash><ext> and records the mapping in
+# static/build/manifest.json. url_for('static', filename=...) then points at the
+# hashed copy, which is served with a one-year immutable Cache-Control, so
+# browsers stop revalidating on each page view. Without a manifest, static URLs
+# and headers are Flask's defaults.
+#
+# With ASSET_PRECOMPRESSED=1 the .br/.gz copies written at build time are sent
+# to clients that accept them, so workers never compress per request. A reverse
+# proxy can also serve static/build directly; nothing in it ever changes.
+
+BUILD_DIR = 'build'
+MANIFEST_NAME = 'manifest.json'
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # preference order
+
+_CSS_STRING = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'')
+_CSS_STRING_OR_COMMENT = re.compile(r'("(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\')|/\*.*?\*/', re.S)
+
+
+def _squeeze_css(segment):
+    segment = re.sub(r'\s+', ' ', segment)
+    segment = re.sub(r' ?([{};,>]) ?', r'\1', segment)
+    # Spaces before ':' are kept; "a :hover" and "a:hover" are different selectors
+    segment = re.sub(r'([:(]) ', r'\1', segment)
+    return segment.replace(';}', '}')
+
+
+def minify_css(source):
+    """Drop comments and redundant whitespace, leaving string literals untouched"""
+    source = _CSS_STRING_OR_COMMENT.sub(lambda match: match.group(1) or ' ', source)
+    strings = _CSS_STRING.findall(source)
+    pieces = [_squeeze_css(piece) for piece in _CSS_STRING.split(source)]
+    merged = [pieces[0]]
+    for string, piece in zip(strings, pieces[1:]):
+        merged.extend((string, piece))
+    return ''.join(merged).strip()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as handle:
+        handle.write(data)
+    os.replace(temp_path, path)
+
+
+def _source_files(static_root):
+    """Static files relative to static_root, skipping the build output and uploads"""
+    skip = {os.path.realpath(os.path.join(static_root, BUILD_DIR)), os.path.realpath(app.config['UPLOAD_FOLDER'])}
+    for dirpath, dirnames, filenames in os.walk(static_root):
+        dirnames[:] = sorted(name for name in dirnames
+                             if not name.startswith('.') and os.path.realpath(os.path.join(dirpath, name)) not in skip)
+        for filename in sorted(filenames):
+            if not filename.startswith('.'):
+                yield os.path.relpath(os.path.join(dirpath, filename), static_root).replace(os.sep, '/')
+
+
+def build_assets(compress=True):
+    """Write minified, fingerprinted (and optionally precompressed) copies; returns the manifest"""
+    static_root = app.static_folder
+    build_root = os.path.join(static_root, BUILD_DIR)
+    manifest = {}
+    for name in _source_files(static_root):
+        with open(os.path.join(static_root, name), 'rb') as handle:
+            data = handle.read()
+        stem, extension = os.path.splitext(name)
+        if extension == '.css':
+            data = minify_css(data.decode('utf-8')).encode('utf-8')
+        hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:16]}{extension}'
+        path = os.path.join(build_root, hashed)
+        _write(path, data)
+        if compress and extension in COMPRESSIBLE_EXTENSIONS:
+            compressed = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed['.br'] = brotli.compress(data, quality=11)
+            for suffix, payload in compressed.items():
+                if len(payload) < len(data):
+                    _write(path + suffix, payload)
+        manifest[name] = hashed
+
+    # Older builds are left in place so pages rendered before a deploy still resolve;
+    # the manifest is replaced last so no worker sees a name that is not written yet
+    _write(os.path.join(build_root, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    app.extensions.pop('asset_manifest', None)
+    return manifest
+
+
+def asset_manifest():
+    """Source name -> fingerprinted name, read once per process"""
+    manifest = app.extensions.get('asset_manifest')
+    if manifest is None:
+        path = os.path.join(app.static_folder, BUILD_DIR, MANIFEST_NAME)
+        try:
+            with open(path, encoding='utf-8') as handle:
+                manifest = json.load(handle)
+        except FileNotFoundError:
+            manifest = {}
+        except ValueError as e:
+            app.logger.error(f"Ignoring unreadable asset manifest {path}: {str(e)}")
+            manifest = {}
+        app.extensions['asset_manifest'] = manifest
+        app.extensions['asset_files'] = {f'{BUILD_DIR}/{hashed}' for hashed in manifest.values()}
+    return manifest
+
+
+@app.url_defaults
+def fingerprint_static_url(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        hashed = asset_manifest().get(values['filename'])
+        if hashed:
+            values['filename'] = f'{BUILD_DIR}/{hashed}'
+
+
+def send_asset(filename):
+    """Serve a static file; fingerprinted builds are immutable and may be precompressed"""
+    asset_manifest()
+    if filename not in app.extensions['asset_files']:
+        return app.send_static_file(filename)
+
+    response = None
+    if app.config['ASSET_PRECOMPRESSED']:
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if encoding in request.accept_encodings and os.path.isfile(os.path.join(app.static_folder, filename + suffix)):
+                response = send_from_directory(app.static_folder, filename + suffix, max_age=IMMUTABLE_MAX_AGE,
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                response.headers['Content-Encoding'] = encoding
+                break
+    if response is None:
+        response = send_from_directory(app.static_folder, filename, max_age=IMMUTABLE_MAX_AGE)
+    if app.config['ASSET_PRECOMPRESSED']:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    return response
+
+
+# Replace Flask's built-in static view; unbuilt files are still served by it
+app.view_functions['static'] = send_asset
+
+
+@app.cli.command('build-assets')
+@click.option('--no-compress', is_flag=True, help='Skip writing .gz/.br copies.')
+def build_assets_command(no_compress):
+    """Minify and fingerprint static files into static/build."""
+    manifest = build_assets(compress=not no_compress)
+    for name, hashed in sorted(manifest.items()):
+        click.echo(f'{name} -> {BUILD_DIR}/{hashed}')
+    if brotli is None and not no_compress:
+        click.echo('brotli is not installed; only gzip copies were written')
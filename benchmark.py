@@ -0,0 +1,395 @@
+import http.cookiejar
+import json
+import math
+import random
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import event, insert, select, func
+from app import app, db
+from models import User, Category, Donation, Request, Match, Notification
+from password_service import hash_password
+
+# Benchmark harness. `flask bench-seed` fills a database with deterministic
+# synthetic data; `flask bench` replays scripted scenarios through the Flask
+# test client (or against a running server with --url) and prints latency
+# percentiles, SQL statements per request and throughput as JSON so runs can
+# be diffed. Point DATABASE_URL at a scratch database: both commands write to it.
+
+BENCH_PASSWORD = 'benchmark'
+BENCH_ADMIN = 'bench_admin'
+SEED_BATCH_SIZE = 2000
+
+WORDS = (
+    'winter coat jacket boots scarf gloves sweater jeans dress shoes blanket pillow lamp chair table desk '
+    'kettle toaster blender pan plates mugs laptop phone charger tablet monitor keyboard radio novel '
+    'cookbook dictionary puzzle board game lego doll stroller crib shampoo soap toothpaste diapers rice '
+    'pasta canned beans cereal formula backpack umbrella towel sheets fan heater'
+).split()
+URGENCIES = ('low', 'normal', 'normal', 'high', 'urgent')
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _insert_chunks(model, rows):
+    """executemany INSERT in SEED_BATCH_SIZE chunks from a row generator; returns the count"""
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= SEED_BATCH_SIZE:
+            db.session.execute(insert(model), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(insert(model), chunk)
+        count += len(chunk)
+    db.session.commit()
+    return count
+
+
+def seed_benchmark_data(scale, seed=42):
+    """Deterministic synthetic data; scale is the number of donations, other tables are sized from it"""
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    n_users = max(scale // 20, 10)
+    n_requests = max(scale // 2, 1)
+    n_matches = scale // 10
+    n_notifications = scale
+
+    password_hash = hash_password(BENCH_PASSWORD)
+    base_user_id = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    users = [{'username': BENCH_ADMIN, 'email': 'bench_admin@example.org', 'password_hash': password_hash,
+              'is_admin': True, 'unread_notifications': 0}]
+    users += [{'username': f'bench_user_{i}', 'email': f'bench_user_{i}@example.org', 'password_hash': password_hash,
+               'is_admin': False, 'unread_notifications': 0} for i in range(1, n_users)]
+    _insert_chunks(User, users)
+    user_ids = list(range(base_user_id, base_user_id + n_users))
+    admin_id = base_user_id
+    category_ids = [category_id for (category_id,) in db.session.query(Category.id)]
+
+    # The first n_matches donations and requests are the matched pairs
+    base_donation_id = (db.session.query(func.max(Donation.id)).scalar() or 0) + 1
+    base_request_id = (db.session.query(func.max(Request.id)).scalar() or 0) + 1
+
+    def donations():
+        for i in range(scale):
+            created_at = now - timedelta(days=rng.uniform(0, 365))
+            if i < n_matches:
+                status = 'donated'
+            else:
+                status = rng.choices(('approved', 'pending', 'rejected'), (70, 22, 8))[0]
+            reviewed = status != 'pending'
+            yield {
+                'title': _text(rng, 3).title(), 'description': _text(rng, 20), 'status': status,
+                'category_id': rng.choice(category_ids), 'donor_id': rng.choice(user_ids),
+                'created_at': created_at,
+                'approved_at': created_at + timedelta(hours=rng.uniform(1, 72)) if reviewed else None,
+                'approved_by_id': admin_id if reviewed else None,
+                'donated_at': created_at + timedelta(days=rng.uniform(3, 30)) if status == 'donated' else None,
+                'thank_you_sent': status == 'donated',
+            }
+
+    def requests():
+        for i in range(n_requests):
+            created_at = now - timedelta(days=rng.uniform(0, 365))
+            fulfilled = i < n_matches
+            yield {
+                'title': 'Need ' + _text(rng, 2), 'description': _text(rng, 15), 'urgency': rng.choice(URGENCIES),
+                'status': 'fulfilled' if fulfilled else 'active', 'category_id': rng.choice(category_ids),
+                'requester_id': rng.choice(user_ids), 'created_at': created_at,
+                'fulfilled_at': created_at + timedelta(days=rng.uniform(1, 30)) if fulfilled else None,
+            }
+
+    def matches():
+        for i in range(n_matches):
+            yield {
+                'donation_id': base_donation_id + i, 'request_id': base_request_id + i, 'matched_by_id': admin_id,
+                'status': 'approved', 'created_at': now - timedelta(days=rng.uniform(0, 300)),
+            }
+
+    def notifications():
+        for _ in range(n_notifications):
+            yield {
+                'title': 'New Donation Submitted', 'message': _text(rng, 8), 'type': 'info',
+                'user_id': admin_id if rng.random() < 0.5 else rng.choice(user_ids),
+                'is_read': rng.random() < 0.7, 'created_at': now - timedelta(days=rng.uniform(0, 365)),
+            }
+
+    counts = {
+        'users': n_users,
+        'donations': _insert_chunks(Donation, donations()),
+        'requests': _insert_chunks(Request, requests()),
+        'matches': _insert_chunks(Match, matches()),
+        'notifications': _insert_chunks(Notification, notifications()),
+    }
+
+    # Keep the maintained totals consistent with the generated rows
+    from stats_service import rebuild_counters
+    from notification_service import rebuild_unread_counts
+    rebuild_counters()
+    rebuild_unread_counts()
+    db.session.commit()
+    return counts
+
+
+@app.cli.command('bench-seed')
+@click.option('--scale', default=10000, show_default=True, help='Number of donations; other tables scale from it.')
+@click.option('--seed', default=42, show_default=True, help='Random seed, so runs are reproducible.')
+def bench_seed_command(scale, seed):
+    """Fill the database with synthetic users, donations, requests, matches and notifications."""
+    if User.query.filter_by(username=BENCH_ADMIN).first():
+        raise click.ClickException('Benchmark data already present; seed a fresh database')
+    started = time.perf_counter()
+    counts = seed_benchmark_data(scale, seed)
+    click.echo(json.dumps(counts))
+    click.echo(f"Seeded in {time.perf_counter() - started:.1f}s", err=True)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(timings, statements, statuses, elapsed):
+    timings = sorted(timings)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    result = {
+        'requests': len(timings),
+        'p50_ms': ms(percentile(timings, 50)),
+        'p95_ms': ms(percentile(timings, 95)),
+        'p99_ms': ms(percentile(timings, 99)),
+        'mean_ms': ms(sum(timings) / len(timings)) if timings else None,
+        'max_ms': ms(timings[-1]) if timings else None,
+        'throughput_rps': round(len(timings) / elapsed, 2) if elapsed else None,
+        'status_codes': dict(sorted(statuses.items())),
+    }
+    if statements:
+        result['sql_statements_mean'] = round(sum(statements) / len(statements), 2)
+        result['sql_statements_max'] = max(statements)
+    return result
+
+
+class TestClientRunner:
+    """Runs requests in-process and counts SQL statements issued by the request thread"""
+
+    mode = 'test-client'
+
+    def __init__(self):
+        app.config['WTF_CSRF_ENABLED'] = False
+        # Keep background mail delivery from adding unrelated statements to the counts
+        app.config['MAIL_DISPATCH_MODE'] = 'worker'
+        self.clients = {}
+        self._statements = 0
+        self._thread = threading.get_ident()
+        event.listen(db.engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        if threading.get_ident() == self._thread:
+            self._statements += 1
+
+    def login(self, role, username):
+        client = self.clients[role] = app.test_client()
+        if username:
+            # A fresh app context per request, as in a real worker; the CLI's own context would share g
+            with app.app_context():
+                client.post('/login', data={'username': username, 'password': BENCH_PASSWORD})
+
+    def request(self, role, method, path):
+        self._statements = 0
+        client = self.clients[role]
+        with app.app_context():
+            # Same form data HTTPRunner posts; create_match ignores the status field
+            response = client.post(path, data={'status': 'approved'}) if method == 'POST' else client.get(path)
+            response.close()
+        return response.status_code, self._statements
+
+
+class HTTPRunner:
+    """Runs requests against a live server such as `gunicorn main:app`; SQL counts are not available"""
+
+    mode = 'http'
+    csrf_pattern = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.openers = {}
+        self.tokens = {}
+
+    def _open(self, role, method, path, data=None):
+        encoded = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=encoded, method=method)
+        try:
+            with self.openers[role].open(request) as response:
+                return response.status, response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as e:
+            return e.code, ''
+
+    def login(self, role, username):
+        self.openers[role] = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+        _, body = self._open(role, 'GET', '/login')
+        token = self.csrf_pattern.search(body).group(1)
+        if username:
+            self._open(role, 'POST', '/login',
+                       {'username': username, 'password': BENCH_PASSWORD, 'csrf_token': token})
+        self.tokens[role] = token
+
+    def request(self, role, method, path):
+        if method == 'POST':
+            status, _ = self._open(role, method, path, {'csrf_token': self.tokens[role], 'status': 'approved'})
+        else:
+            status, _ = self._open(role, method, path)
+        return status, None
+
+
+def build_scenarios(rng):
+    """(name, role, method, path factory, check) for each scenario.
+
+    POST scenarios draw from pools they consume; their check returns how many of
+    the posted items were left unchanged, so a silently rejected form shows up.
+    """
+    def ids(query, limit=10000):
+        return [row[0] for row in query.limit(limit)]
+
+    approved = ids(db.session.query(Donation.id).filter_by(status='approved').order_by(Donation.id))
+    pending = ids(db.session.query(Donation.id).filter_by(status='pending').order_by(Donation.id))
+    active = ids(db.session.query(Request.id).filter_by(status='active').order_by(Request.id))
+    category_ids = [category_id for (category_id,) in db.session.query(Category.id)]
+    rng.shuffle(pending)
+    # Matching consumes donations and requests, so take them from the end of the pools
+    match_pairs = list(zip(approved[len(approved) // 2:], active[len(active) // 2:]))
+    rng.shuffle(match_pairs)
+    browsable = approved[:len(approved) // 2] or approved
+
+    approved_ids, matched_ids = [], []
+
+    def pop(pool, taken, render):
+        def make_path():
+            if not pool:
+                return None
+            item = pool.pop()
+            taken.append(item)
+            return render(item)
+        return make_path
+
+    def still(taken, status, donation_id=lambda item: item):
+        def check():
+            if not taken:
+                return 0
+            # End the CLI session's read transaction so the requests' commits are visible
+            db.session.rollback()
+            donation_ids = [donation_id(item) for item in taken]
+            return db.session.query(Donation.id).filter(Donation.id.in_(donation_ids), Donation.status == status).count()
+        return check
+
+    return [
+        ('home_anonymous', 'anonymous', 'GET', lambda: '/', None),
+        ('home', 'user', 'GET', lambda: '/', None),
+        ('browse', 'user', 'GET', lambda: '/browse', None),
+        ('browse_search', 'user', 'GET', lambda: f'/browse?search={rng.choice(WORDS)}', None),
+        ('browse_filtered', 'user', 'GET',
+         lambda: f'/browse?category={rng.choice(category_ids)}&days=90&has_photo=&sort=oldest', None),
+        ('item_detail', 'user', 'GET', lambda: f'/item/{rng.choice(browsable)}' if browsable else None, None),
+        ('admin_dashboard', 'admin', 'GET', lambda: '/admin', None),
+        ('approve_donation', 'admin', 'POST',
+         pop(pending, approved_ids, lambda donation_id: f'/approve_donation/{donation_id}'),
+         still(approved_ids, 'pending')),
+        ('create_match', 'admin', 'POST',
+         pop(match_pairs, matched_ids, lambda pair: f'/create_match/{pair[0]}/{pair[1]}'),
+         still(matched_ids, 'approved', lambda pair: pair[0])),
+    ]
+
+
+def run_benchmark(runner, iterations, warmup, only=None, seed=1):
+    rng = random.Random(seed)
+    scenarios = [scenario for scenario in build_scenarios(rng) if not only or scenario[0] in only]
+    regular_user = db.session.query(User.username).filter(
+        User.username.like('bench_user_%'), User.is_admin.is_(False)
+    ).order_by(User.id).first()
+    if regular_user is None:
+        raise click.ClickException('No benchmark users found; run `flask bench-seed` first')
+    runner.login('anonymous', None)
+    runner.login('user', regular_user[0])
+    runner.login('admin', BENCH_ADMIN)
+
+    results = {}
+    for name, role, method, make_path, check in scenarios:
+        for _ in range(warmup if method == 'GET' else 0):
+            path = make_path()
+            if path:
+                runner.request(role, method, path)
+        timings, statements, statuses = [], [], {}
+        started = time.perf_counter()
+        for _ in range(iterations):
+            path = make_path()
+            if path is None:
+                break
+            request_started = time.perf_counter()
+            status, count = runner.request(role, method, path)
+            timings.append(time.perf_counter() - request_started)
+            if count is not None:
+                statements.append(count)
+            statuses[status] = statuses.get(status, 0) + 1
+        results[name] = summarize(timings, statements, statuses, time.perf_counter() - started)
+        if check:
+            unchanged = check()
+            results[name]['unchanged'] = unchanged
+            if unchanged:
+                click.echo(f"{name}: {unchanged} of {len(timings)} posts left the item unchanged", err=True)
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@app.cli.command('bench')
+@click.option('--iterations', default=100, show_default=True, help='Requests per scenario.')
+@click.option('--warmup', default=5, show_default=True, help='Untimed requests per read scenario.')
+@click.option('--scenario', 'scenarios', multiple=True, help='Run only these scenarios (repeatable).')
+@click.option('--url', help='Benchmark a running server (e.g. gunicorn main:app) instead of the test client.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='Also write the JSON report here.')
+@click.option('--seed', default=1, show_default=True, help='Random seed for scenario parameters.')
+def bench_command(iterations, warmup, scenarios, url, output, seed):
+    """Replay the benchmark scenarios and report p50/p95/p99, SQL statements and throughput as JSON."""
+    runner = HTTPRunner(url) if url else TestClientRunner()
+    results = run_benchmark(runner, iterations, warmup, set(scenarios), seed)
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'mode': runner.mode,
+            'target': url or app.config['SQLALCHEMY_DATABASE_URI'].split('@')[-1],
+            'engine_profile': app.config.get('DB_ENGINE_PROFILE'),
+            'rows': {
+                'donations': db.session.scalar(select(func.count(Donation.id))),
+                'requests': db.session.scalar(select(func.count(Request.id))),
+                'matches': db.session.scalar(select(func.count(Match.id))),
+                'notifications': db.session.scalar(select(func.count(Notification.id))),
+            },
+            'iterations': iterations,
+        },
+        'scenarios': results,
+    }
+    text = json.dumps(report, indent=2)
+    click.echo(text)
+    if output:
+        with open(output, 'w', encoding='utf-8') as handle:
+            handle.write(text + '\n')
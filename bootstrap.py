@@ -0,0 +1,118 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+import click
+from app import app, db
+from models import User, Category
+
+# One-time database setup, kept out of app import so web workers start without
+# touching the schema. Run `flask init-db` once per deployment (and after
+# upgrades); set AUTO_INIT_DB=1 to have create_app() do it instead.
+
+DEFAULT_CATEGORIES = [
+    {'name': 'Clothing', 'description': 'Clothes, shoes, accessories'},
+    {'name': 'Household Items', 'description': 'Furniture, kitchenware, decorations'},
+    {'name': 'Electronics', 'description': 'Phones, computers, appliances'},
+    {'name': 'Books & Media', 'description': 'Books, movies, games'},
+    {'name': 'Toys & Games', 'description': 'Children\'s toys and games'},
+    {'name': 'Personal Care', 'description': 'Hygiene products, cosmetics'},
+    {'name': 'Food & Supplies', 'description': 'Non-perishable food items'},
+    {'name': 'Other', 'description': 'Items that don\'t fit other categories'}
+]
+
+
+def init_schema():
+    """Create tables, then the columns, indexes and search structures create_all() cannot add"""
+    db.create_all()
+
+    # Columns and indexes added to tables that already existed before they were declared
+    from migrations import upgrade_schema
+    upgrade_schema()
+
+    # Full-text search index lives outside the ORM metadata
+    from search_service import ensure_search_index
+    ensure_search_index()
+
+
+def create_default_data():
+    """Add the default categories and admin user if missing; returns the names created"""
+    created = []
+    existing = {name for (name,) in db.session.query(Category.name)}
+    for cat_data in DEFAULT_CATEGORIES:
+        if cat_data['name'] not in existing:
+            db.session.add(Category(**cat_data))
+            created.append(cat_data['name'])
+
+    # Create default admin user
+    if not User.query.filter_by(username='admin').first():
+        admin = User(
+            username='admin',
+            email='admin@sistershare.org',
+            is_admin=True
+        )
+        admin.set_password('admin123')  # Change this in production
+        db.session.add(admin)
+        created.append('admin user')
+
+    db.session.commit()
+    return created
+
+
+def seed():
+    created = create_default_data()
+
+    # Seed the dashboard counters on first run
+    from stats_service import ensure_counters
+    ensure_counters()
+
+    # Backfill unread counts for users created before the column existed
+    from notification_service import rebuild_unread_counts
+    rebuild_unread_counts(only_missing=True)
+    db.session.commit()
+    return created
+
+
+def init_database():
+    init_schema()
+    return seed()
+
+
+@app.cli.command('init-db')
+@click.option('--no-seed', is_flag=True, help='Only create and upgrade the schema.')
+def init_db_command(no_seed):
+    """Create or upgrade the schema and seed default data."""
+    init_schema()
+    click.echo("Schema is ready")
+    if not no_seed:
+        for name in seed():
+            click.echo(f"Created {name}")
+
+
+@app.cli.command('seed')
+def seed_command():
+    """Add default categories, the admin user and dashboard counters if missing."""
+    created = seed()
+    for name in created:
+        click.echo(f"Created {name}")
+    if not created:
+        click.echo("Default data already present")
+
+
+def _time_cold_import(auto_init):
+    env = dict(os.environ, AUTO_INIT_DB='1' if auto_init else '0', MAIL_DISPATCH_MODE='worker')
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import main'], env=env, check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+@app.cli.command('bench-startup')
+@click.option('--runs', default=5, show_default=True, help='Cold imports per mode.')
+def bench_startup(runs):
+    """Compare cold import time with and without database setup at startup."""
+    for label, auto_init in (('import + init-db (old startup)', True), ('import only', False)):
+        timings = [_time_cold_import(auto_init) for _ in range(runs)]
+        click.echo(f"{label}: median {statistics.median(timings) * 1000:.0f} ms, "
+                   f"min {min(timings) * 1000:.0f} ms over {runs} runs")
@@ -0,0 +1,166 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+# Page cache for anonymous traffic on the landing and browse pages.
+# Entries are keyed on a namespace generation plus the normalized query args;
+# invalidating a namespace bumps its generation, so stale entries are never
+# read again and simply age out. The in-process LRU backend is per worker
+# (other workers only see an invalidation once the TTL expires); a shared
+# backend such as Redis makes invalidation immediate across workers.
+
+
+class LRUCache:
+    """Thread-safe in-process cache with a size bound and per-entry TTL"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        # Namespace generations are kept apart so LRU eviction can never reset them
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Shared cache for all workers; needs the optional redis package"""
+
+    def __init__(self, url, prefix='sistershare:'):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(self._prefix + key, pickle.dumps(value), ex=int(ttl))
+
+    def incr(self, key):
+        return self._client.incr(self._prefix + key)
+
+    def counter(self, key):
+        return int(self._client.get(self._prefix + key) or 0)
+
+    def clear(self):
+        for key in self._client.scan_iter(self._prefix + '*'):
+            self._client.delete(key)
+
+
+class NullCache:
+    """Disables caching"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def counter(self, key):
+        return 0
+
+    def clear(self):
+        pass
+
+
+CACHE_BACKENDS = {
+    'lru': lambda app: LRUCache(app.config.get('CACHE_LRU_SIZE', 1024)),
+    'redis': lambda app: RedisCache(app.config['CACHE_REDIS_URL']),
+    'null': lambda app: NullCache(),
+}
+
+
+def register_cache_backend(name, factory):
+    """Make a backend available to CACHE_BACKEND; factory receives the Flask app"""
+    CACHE_BACKENDS[name] = factory
+
+
+def get_cache():
+    """Cache backend for the current app, created once per app"""
+    app = current_app._get_current_object()
+    cache = app.extensions.get('page_cache')
+    if cache is None:
+        cache = app.extensions['page_cache'] = CACHE_BACKENDS[app.config.get('CACHE_BACKEND', 'lru')](app)
+    return cache
+
+
+def invalidate(*namespaces):
+    """Drop every cached entry in the given namespaces"""
+    cache = get_cache()
+    for namespace in namespaces:
+        cache.incr(f'gen:{namespace}')
+
+
+def normalized_args(args):
+    """Query args with blanks dropped and keys sorted, so equivalent URLs share an entry"""
+    return tuple(sorted((key, value) for key, values in args.lists() for value in values if value != ''))
+
+
+def cached_page(namespace, ttl=None):
+    """Cache a view's rendered HTML for anonymous GET requests, keyed on its query args"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Signed-in users see personalised navigation, and pending flash messages must not be cached
+            if request.method != 'GET' or current_user.is_authenticated or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            cache = get_cache()
+            key = f'page:{namespace}:{cache.counter(f"gen:{namespace}")}:{request.path}:{normalized_args(request.args)!r}'
+            body = cache.get(key)
+            if body is not None:
+                response = make_response(body)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                cache.set(key, response.get_data(as_text=True), ttl or current_app.config.get('CACHE_DEFAULT_TTL', 60))
+                response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import namedtuple
+from flask import g, has_request_context
+from sqlalchemy import event
+from app import app, db
+from models import Category
+from cache import get_cache, invalidate as invalidate_pages
+
+# Categories are read on nearly every page (form choices, filters, card labels)
+# but almost never change, so they are loaded once into a process-local registry.
+# The registry is versioned through the page cache's generation counters: a
+# committed change to any category bumps the version, and each worker reloads
+# on its next lookup. With an in-process cache backend other workers pick the
+# change up after CATEGORY_CACHE_TTL; a shared backend makes it immediate.
+
+VERSION_KEY = 'gen:categories'
+
+CategoryInfo = namedtuple('CategoryInfo', 'id name description')
+
+
+_Snapshot = namedtuple('_Snapshot', 'ordered by_id version loaded_at')
+
+
+class CategoryRegistry:
+    """In-memory snapshot of the category table"""
+
+    def __init__(self):
+        # Replaced as a whole, so a concurrent reader never pairs a new list with an old index
+        self._snapshot = _Snapshot((), {}, None, 0.0)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        rows = db.session.query(Category.id, Category.name, Category.description).order_by(Category.id).all()
+        return tuple(CategoryInfo(*row) for row in rows)
+
+    def _version(self):
+        # Read at most once per request; with Redis each read is a round trip, and a
+        # browse page looks up a category name for every card
+        if not has_request_context():
+            return get_cache().counter(VERSION_KEY)
+        if '_category_version' not in g:
+            g._category_version = get_cache().counter(VERSION_KEY)
+        return g._category_version
+
+    def _stale(self, snapshot, version):
+        return version != snapshot.version or time.monotonic() - snapshot.loaded_at > app.config.get('CATEGORY_CACHE_TTL', 300)
+
+    def _current(self):
+        snapshot = self._snapshot
+        version = self._version()
+        if self._stale(snapshot, version):
+            with self._lock:
+                snapshot = self._snapshot
+                if self._stale(snapshot, version):
+                    ordered = self._load()
+                    snapshot = self._snapshot = _Snapshot(
+                        ordered, {info.id: info for info in ordered}, version, time.monotonic()
+                    )
+        return snapshot
+
+    def all(self):
+        """Every category in id order"""
+        return self._current().ordered
+
+    def by_name(self):
+        """Every category in name order, for filter dropdowns"""
+        return sorted(self._current().ordered, key=lambda info: info.name)
+
+    def choices(self):
+        """(id, name) pairs for SelectField choices"""
+        return [(info.id, info.name) for info in self._current().ordered]
+
+    def get(self, category_id):
+        return self._current().by_id.get(category_id)
+
+    def name(self, category_id):
+        info = self.get(category_id)
+        return info.name if info else ''
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = self._snapshot._replace(version=None)
+        if has_request_context():
+            g.pop('_category_version', None)
+
+
+categories = CategoryRegistry()
+
+
+def invalidate_categories():
+    """Force every worker to reload categories on its next lookup"""
+    get_cache().incr(VERSION_KEY)
+    categories.clear()
+    # Landing and browse pages render category names and filters
+    invalidate_pages('index', 'browse')
+
+
+@app.template_global()
+def category_name(category_id):
+    return categories.name(category_id)
+
+
+@app.template_global()
+def category_info(category_id):
+    return categories.get(category_id)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_category_changes(session, flush_context):
+    changed = session.new | session.dirty | session.deleted
+    if any(isinstance(obj, Category) for obj in changed):
+        session.info['categories_changed'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('categories_changed', False):
+        invalidate_categories()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('categories_changed', None)
@@ -0,0 +1,49 @@
+from datetime import date, datetime, timedelta
+
+# Date filters expressed as half-open ranges on the raw column
+# (column >= start AND column < end) so they can use an index range scan,
+# unlike func.date(column) which has to be evaluated for every row.
+
+# Presets offered on /browse as "added in the last N days"
+RECENT_DAY_PRESETS = (7, 30, 90, 365)
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD form value; returns None when missing or invalid"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def month_start(day, months_back=0):
+    """First day of the month months_back calendar months before day's month"""
+    index = day.year * 12 + day.month - 1 - months_back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def date_range_bounds(date_from=None, date_to=None):
+    """Inclusive calendar dates -> (start, end) datetimes for start <= x < end; either may be None"""
+    start = datetime.combine(date_from, datetime.min.time()) if date_from else None
+    end = datetime.combine(date_to + timedelta(days=1), datetime.min.time()) if date_to else None
+    return start, end
+
+
+def recent_days_start(days, now=None):
+    """Start of the window covering today and the previous days - 1 days.
+
+    Rounded down to midnight so the bound (and any cached result keyed on it) is stable all day.
+    """
+    today = (now or datetime.utcnow()).date()
+    return datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+
+
+def apply_date_range(query, column, start=None, end=None):
+    """Filter query to start <= column < end"""
+    if start is not None:
+        query = query.filter(column >= start)
+    if end is not None:
+        query = query.filter(column < end)
+    return query
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Named engine profiles selected with DB_ENGINE_PROFILE. Each one sets the pool
+# size, overflow and timeouts for its database, the per-statement timeout and,
+# on SQLite, the pragmas applied to every new connection. Checkout waits are
+# timed by the pool itself so slow checkouts show up before workers time out.
+
+logger = logging.getLogger(__name__)
+
+ENGINE_PROFILES = {
+    # Single developer, default rollback journal
+    'sqlite-dev': {
+        'dialect': 'sqlite',
+        'pool_size': 5,
+        'max_overflow': 5,
+        'pool_timeout': 10,
+        'pragmas': {'foreign_keys': 'ON', 'busy_timeout': 5000},
+    },
+    # Several gunicorn workers on one SQLite file: readers no longer block the
+    # writer, and a busy writer is waited for instead of failing with "database is locked"
+    'sqlite-wal': {
+        'dialect': 'sqlite',
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 10,
+        'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'foreign_keys': 'ON', 'busy_timeout': 15000},
+    },
+    # Connections are recycled well inside server and proxy idle limits, which
+    # makes a pre-ping round trip on every checkout unnecessary
+    'postgres-prod': {
+        'dialect': 'postgresql',
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 5,
+        'pool_recycle': 1800,
+        'pool_pre_ping': False,
+        'pool_use_lifo': True,
+        'connect_timeout': 5,
+        'statement_timeout_ms': 15000,
+        'idle_in_transaction_timeout_ms': 60000,
+    },
+}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection"""
+
+    slow_checkout_ms = 100
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            if waited * 1000 > self.slow_checkout_ms:
+                logger.warning(f"Waited {waited * 1000:.0f} ms for a database connection ({self.status()})")
+
+    def wait_stats(self):
+        with self._stats_lock:
+            return {
+                'pool_size': self.size(),
+                'checked_out': self.checkedout(),
+                'overflow': max(self.overflow(), 0),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_total_seconds': round(self.wait_total, 6),
+                'wait_avg_ms': round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+            }
+
+
+def default_profile(database_uri):
+    return 'postgres-prod' if database_uri.startswith('postgres') else 'sqlite-dev'
+
+
+def check_profile(database_uri, profile):
+    """Profile settings for the URI; raises ValueError for an unknown profile or another database's profile"""
+    settings = ENGINE_PROFILES.get(profile)
+    if settings is None:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE {profile!r}; choose one of {', '.join(sorted(ENGINE_PROFILES))}")
+    dialect = make_url(database_uri).get_backend_name()
+    if dialect == 'postgres':
+        # Legacy postgres:// URLs some hosts still hand out
+        dialect = 'postgresql'
+    if dialect != settings['dialect']:
+        raise ValueError(f"DB_ENGINE_PROFILE {profile!r} is for {settings['dialect']}, but DATABASE_URL is {dialect}")
+    return settings
+
+
+def engine_options(database_uri, profile, overrides=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for a profile; overrides replace individual profile settings"""
+    settings = dict(check_profile(database_uri, profile), **{k: v for k, v in (overrides or {}).items() if v is not None})
+    if database_uri.startswith('sqlite') and (':memory:' in database_uri or database_uri.rstrip('/') == 'sqlite:'):
+        # In-memory databases live on a single connection; keep SQLAlchemy's pool for them
+        return {}
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': settings['pool_size'],
+        'max_overflow': settings['max_overflow'],
+        'pool_timeout': settings['pool_timeout'],
+        'pool_pre_ping': settings.get('pool_pre_ping', False),
+    }
+    for key in ('pool_recycle', 'pool_use_lifo'):
+        if key in settings:
+            options[key] = settings[key]
+
+    if database_uri.startswith('postgres'):
+        server_options = [f"-c statement_timeout={settings['statement_timeout_ms']}"]
+        if settings.get('idle_in_transaction_timeout_ms'):
+            server_options.append(f"-c idle_in_transaction_session_timeout={settings['idle_in_transaction_timeout_ms']}")
+        options['connect_args'] = {
+            'connect_timeout': settings['connect_timeout'],
+            'options': ' '.join(server_options),
+            'application_name': 'sister_share_shop',
+        }
+    else:
+        # sqlite3 waits this long for a lock before raising; busy_timeout below matches it
+        options['connect_args'] = {'timeout': settings['pragmas']['busy_timeout'] / 1000, 'check_same_thread': False}
+    return options
+
+
+def install_engine_hooks(engine, profile):
+    """Apply the profile's SQLite pragmas to every new connection"""
+    pragmas = ENGINE_PROFILES[profile].get('pragmas')
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+
+def pool_metrics(engine):
+    """Checkout wait metrics for the engine's pool, or None when it is not a TimedQueuePool"""
+    pool = engine.pool
+    return pool.wait_stats() if isinstance(pool, TimedQueuePool) else None
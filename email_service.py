@@ -1,7 +1,26 @@
 import os
+import threading
+import time
+from datetime import datetime, timedelta
+import click
 from flask import current_app, render_template_string
 from flask_mail import Message
-from app import mail
+from sqlalchemy import event, or_, and_, update
+from app import app, db, mail
+from models import EmailOutbox
+from category_registry import category_name
+
+
+def enqueue_email(msg):
+    """Persist a message to the outbox; delivery happens in the dispatcher"""
+    outbox = EmailOutbox(
+        subject=msg.subject,
+        recipients=','.join(msg.recipients),
+        body=msg.body
+    )
+    db.session.add(outbox)
+    db.session.info['outbox_pending'] = True
+    return outbox
 
 def send_thank_you_email(donation):
     """Send automated thank you email to donor"""
@@ -16,7 +35,7 @@ def send_thank_you_email(donation):
 
         Item Details:
         - Title: {donation.title}
-        - Category: {donation.category.name}
+        - Category: {category_name(donation.category_id)}
         - Donated on: {donation.donated_at.strftime('%B %d, %Y') if donation.donated_at else 'Recently'}
 
         We are grateful for your support and generosity. Together, we're building a stronger, more caring community.
@@ -34,12 +53,12 @@ def send_thank_you_email(donation):
             body=body
         )
         
-        mail.send(msg)
-        current_app.logger.info(f"Thank you email sent to {donation.donor.email} for donation {donation.id}")
+        enqueue_email(msg)
+        current_app.logger.info(f"Thank you email queued for {donation.donor.email} for donation {donation.id}")
         return True
         
     except Exception as e:
-        current_app.logger.error(f"Failed to send thank you email: {str(e)}")
+        current_app.logger.error(f"Failed to queue thank you email: {str(e)}")
         return False
 
 def send_match_notification(donation, request, match):
@@ -56,7 +75,7 @@ def send_match_notification(donation, request, match):
 
         Donation Details:
         - Item: {donation.title}
-        - Category: {donation.category.name}
+        - Category: {category_name(donation.category_id)}
         - Matched on: {match.created_at.strftime('%B %d, %Y')}
 
         Your kindness is truly appreciated.
@@ -82,7 +101,7 @@ def send_match_notification(donation, request, match):
 
         Request Details:
         - Item: {request.title}
-        - Category: {request.category.name}
+        - Category: {category_name(request.category_id)}
         - Matched on: {match.created_at.strftime('%B %d, %Y')}
 
         Thank you for being part of the Sister Share Shop community!
@@ -97,14 +116,14 @@ def send_match_notification(donation, request, match):
             body=requester_body
         )
 
-        mail.send(donor_msg)
-        mail.send(requester_msg)
+        enqueue_email(donor_msg)
+        enqueue_email(requester_msg)
         
-        current_app.logger.info(f"Match notification emails sent for match {match.id}")
+        current_app.logger.info(f"Match notification emails queued for match {match.id}")
         return True
         
     except Exception as e:
-        current_app.logger.error(f"Failed to send match notification emails: {str(e)}")
+        current_app.logger.error(f"Failed to queue match notification emails: {str(e)}")
         return False
 
 def send_admin_notification(subject, message, admin_emails=None):
@@ -125,10 +144,139 @@ def send_admin_notification(subject, message, admin_emails=None):
             body=message
         )
         
-        mail.send(msg)
-        current_app.logger.info(f"Admin notification sent: {subject}")
+        enqueue_email(msg)
+        current_app.logger.info(f"Admin notification queued: {subject}")
         return True
         
     except Exception as e:
-        current_app.logger.error(f"Failed to send admin notification: {str(e)}")
+        current_app.logger.error(f"Failed to queue admin notification: {str(e)}")
         return False
+
+def claim_outbox_batch(batch_size):
+    """Claim due outbox rows for this worker; a conditional UPDATE keeps concurrent workers apart"""
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=current_app.config['MAIL_CLAIM_TIMEOUT'])
+    candidates = db.session.query(EmailOutbox.id).filter(
+        or_(
+            and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+            and_(EmailOutbox.status == 'sending', EmailOutbox.claimed_at < stale_before)
+        )
+    ).order_by(EmailOutbox.id).limit(batch_size).all()
+
+    claimed = []
+    for (outbox_id,) in candidates:
+        result = db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == outbox_id)
+            .where(or_(
+                EmailOutbox.status == 'pending',
+                and_(EmailOutbox.status == 'sending', EmailOutbox.claimed_at < stale_before)
+            ))
+            .values(status='sending', claimed_at=now)
+        )
+        if result.rowcount:
+            claimed.append(outbox_id)
+    db.session.commit()
+
+    if not claimed:
+        return []
+    return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed)).order_by(EmailOutbox.id).all()
+
+def record_failure(outbox, error):
+    """Schedule a retry with exponential backoff, or give up after MAIL_MAX_ATTEMPTS"""
+    outbox.attempts = (outbox.attempts or 0) + 1
+    outbox.last_error = str(error)
+    outbox.claimed_at = None
+    if outbox.attempts >= current_app.config['MAIL_MAX_ATTEMPTS']:
+        outbox.status = 'failed'
+    else:
+        delay = current_app.config['MAIL_RETRY_BACKOFF'] * (2 ** (outbox.attempts - 1))
+        outbox.status = 'pending'
+        outbox.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+def dispatch_outbox(batch_size=None):
+    """Deliver one batch of due outbox messages over a single SMTP connection"""
+    batch = claim_outbox_batch(batch_size or current_app.config['MAIL_BATCH_SIZE'])
+    if not batch:
+        return 0
+
+    sent = 0
+    try:
+        with mail.connect() as conn:
+            for outbox in batch:
+                try:
+                    conn.send(Message(
+                        subject=outbox.subject,
+                        recipients=outbox.recipients.split(','),
+                        body=outbox.body
+                    ))
+                    outbox.status = 'sent'
+                    outbox.attempts = (outbox.attempts or 0) + 1
+                    outbox.sent_at = datetime.utcnow()
+                    outbox.last_error = None
+                    sent += 1
+                except Exception as e:
+                    current_app.logger.error(f"Failed to send outbox email {outbox.id}: {str(e)}")
+                    record_failure(outbox, e)
+    except Exception as e:
+        # Connecting failed, so nothing in the batch left this process
+        current_app.logger.error(f"Failed to connect to mail server: {str(e)}")
+        for outbox in batch:
+            if outbox.status == 'sending':
+                record_failure(outbox, e)
+
+    db.session.commit()
+    current_app.logger.info(f"Mail dispatcher sent {sent} of {len(batch)} queued emails")
+    return sent
+
+class MailDispatcher:
+    """Background thread that drains the outbox; woken whenever a commit adds mail"""
+
+    def __init__(self):
+        self._thread = None
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_started(self, flask_app):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, args=(flask_app,),
+                                                name='mail-dispatcher', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _run(self, flask_app):
+        interval = flask_app.config['MAIL_POLL_INTERVAL']
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            with flask_app.app_context():
+                try:
+                    while dispatch_outbox():
+                        pass
+                except Exception as e:
+                    flask_app.logger.error(f"Mail dispatcher error: {str(e)}")
+                finally:
+                    db.session.remove()
+
+dispatcher = MailDispatcher()
+
+@event.listens_for(db.session, 'after_commit')
+def _wake_dispatcher(session):
+    if session.info.pop('outbox_pending', False) and app.config['MAIL_DISPATCH_MODE'] == 'thread':
+        dispatcher.ensure_started(app)
+        dispatcher.wake()
+
+@app.cli.command('mail-worker')
+@click.option('--once', is_flag=True, help='Drain the outbox once and exit.')
+def mail_worker(once):
+    """Deliver queued emails from the outbox."""
+    interval = app.config['MAIL_POLL_INTERVAL']
+    while True:
+        while dispatch_outbox():
+            pass
+        if once:
+            break
+        time.sleep(interval)
@@ -0,0 +1,219 @@
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+import click
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import aliased
+from app import app, db
+from models import User, Category, Donation, Request, Match
+from date_filters import parse_date, date_range_bounds, apply_date_range
+
+# Admin exports and the monthly impact report. Exports select plain columns
+# and stream them with yield_per (a server-side cursor on PostgreSQL), writing
+# CSV or JSONL in chunks, so neither the web worker nor the CLI ever holds the
+# full result. The impact report is computed entirely with GROUP BY aggregates.
+
+EXPORT_CHUNK_ROWS = 500
+EXPORT_FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+# Spreadsheets evaluate a cell starting with one of these as a formula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+Donor = aliased(User)
+Requester = aliased(User)
+Matcher = aliased(User)
+MatchedDonation = aliased(Donation)
+MatchedRequest = aliased(Request)
+
+
+def _donation_export():
+    columns = [
+        Donation.id, Donation.title, Donation.description, Category.name.label('category'), Donation.status,
+        Donor.username.label('donor'), Donation.created_at, Donation.approved_at, Donation.donated_at,
+    ]
+    statement = select(*columns).join(Category, Donation.category_id == Category.id).join(Donor, Donation.donor_id == Donor.id)
+    return statement, Donation
+
+
+def _request_export():
+    columns = [
+        Request.id, Request.title, Request.description, Category.name.label('category'), Request.urgency,
+        Request.status, Requester.username.label('requester'), Request.created_at, Request.fulfilled_at,
+    ]
+    statement = select(*columns).join(Category, Request.category_id == Category.id).join(Requester, Request.requester_id == Requester.id)
+    return statement, Request
+
+
+def _match_export():
+    columns = [
+        Match.id, Match.status, MatchedDonation.id.label('donation_id'), MatchedDonation.title.label('donation_title'),
+        MatchedRequest.id.label('request_id'), MatchedRequest.title.label('request_title'),
+        Category.name.label('category'), Matcher.username.label('matched_by'), Match.created_at,
+    ]
+    statement = (
+        select(*columns)
+        .join(MatchedDonation, Match.donation_id == MatchedDonation.id)
+        .join(MatchedRequest, Match.request_id == MatchedRequest.id)
+        .join(Category, MatchedDonation.category_id == Category.id)
+        .join(Matcher, Match.matched_by_id == Matcher.id)
+    )
+    return statement, Match
+
+
+EXPORTS = {
+    'donations': _donation_export,
+    'requests': _request_export,
+    'matches': _match_export,
+}
+
+
+def export_statement(kind, status=None, category_id=None, date_from=None, date_to=None):
+    """SELECT for an export, filtered by status, category and an inclusive created_at date range"""
+    statement, model = EXPORTS[kind]()
+    if status:
+        statement = statement.where(model.status == status)
+    if category_id:
+        statement = statement.where(Category.id == category_id)
+    start, end = date_range_bounds(date_from, date_to)
+    statement = apply_date_range(statement, model.created_at, start, end)
+    return statement.order_by(model.id)
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _csv_value(value):
+    """Quote user-entered text that a spreadsheet would otherwise run as a formula"""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def generate_export(statement, file_format):
+    """Yield the export in text chunks of EXPORT_CHUNK_ROWS rows"""
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+    fields = list(result.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if file_format == 'csv' else None
+    if writer:
+        writer.writerow(fields)
+    for rows in result.partitions():
+        for row in rows:
+            if writer:
+                writer.writerow(map(_csv_value, row))
+            else:
+                buffer.write(json.dumps(dict(zip(fields, map(_json_value, row)))) + '\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_filters(args):
+    """Export filters from request args or CLI options"""
+    return {
+        'status': args.get('status') or None,
+        'category_id': int(args['category']) if str(args.get('category') or '').isdigit() else None,
+        'date_from': parse_date(args.get('date_from')),
+        'date_to': parse_date(args.get('date_to')),
+    }
+
+
+def month_bucket(column):
+    """YYYY-MM label for a timestamp column"""
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+def days_between(start_column, end_column):
+    if db.engine.dialect.name == 'postgresql':
+        return func.extract('epoch', end_column - start_column) / 86400.0
+    return func.julianday(end_column) - func.julianday(start_column)
+
+
+def impact_report(date_from=None, date_to=None):
+    """Monthly donations per category and time-to-match, all computed in SQL"""
+    start, end = date_range_bounds(date_from, date_to)
+
+    month = month_bucket(Donation.created_at)
+    donations = db.session.execute(apply_date_range(
+        select(
+            month.label('month'),
+            Category.name.label('category'),
+            func.count(Donation.id).label('donations'),
+            func.sum(case((Donation.status == 'donated', 1), else_=0)).label('donated'),
+        ).join(Category, Donation.category_id == Category.id),
+        Donation.created_at, start, end
+    ).group_by(month, Category.name).order_by(month, Category.name)).all()
+
+    match_month = month_bucket(Match.created_at)
+    wait_days = days_between(MatchedDonation.created_at, Match.created_at)
+    request_wait_days = days_between(MatchedRequest.created_at, Match.created_at)
+    matches = db.session.execute(apply_date_range(
+        select(
+            match_month.label('month'),
+            func.count(Match.id).label('matches'),
+            func.avg(wait_days).label('avg_days_donation_to_match'),
+            func.max(wait_days).label('max_days_donation_to_match'),
+            func.avg(request_wait_days).label('avg_days_request_to_match'),
+        )
+        .join(MatchedDonation, Match.donation_id == MatchedDonation.id)
+        .join(MatchedRequest, Match.request_id == MatchedRequest.id),
+        Match.created_at, start, end
+    ).group_by(match_month).order_by(match_month)).all()
+
+    request_month = month_bucket(Request.created_at)
+    requests = db.session.execute(apply_date_range(
+        select(
+            request_month.label('month'),
+            func.count(Request.id).label('requests'),
+            func.sum(case((Request.status == 'fulfilled', 1), else_=0)).label('fulfilled'),
+        ),
+        Request.created_at, start, end
+    ).group_by(request_month).order_by(request_month)).all()
+
+    return {'donations_by_category': donations, 'matches': matches, 'requests': requests}
+
+
+@app.cli.command('export')
+@click.argument('kind', type=click.Choice(list(EXPORTS)))
+@click.option('--format', 'file_format', type=click.Choice(list(EXPORT_FORMATS)), default='csv', show_default=True)
+@click.option('--status', help='Only rows with this status.')
+@click.option('--category', help='Only rows in this category id.')
+@click.option('--from', 'date_from', help='Created on or after YYYY-MM-DD.')
+@click.option('--to', 'date_to', help='Created on or before YYYY-MM-DD.')
+@click.option('--output', type=click.Path(dir_okay=False, writable=True), help='File to write; stdout by default.')
+def export_command(kind, file_format, status, category, date_from, date_to, output):
+    """Stream donations, requests or matches as CSV or JSONL."""
+    filters = export_filters({'status': status, 'category': category, 'date_from': date_from, 'date_to': date_to})
+    statement = export_statement(kind, **filters)
+    handle = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+    try:
+        for chunk in generate_export(statement, file_format):
+            handle.write(chunk)
+    finally:
+        if output:
+            handle.close()
+
+
+@app.cli.command('impact-report')
+@click.option('--from', 'date_from', help='Start date, YYYY-MM-DD.')
+@click.option('--to', 'date_to', help='End date, YYYY-MM-DD.')
+def impact_report_command(date_from, date_to):
+    """Print monthly donations per category and time-to-match."""
+    report = impact_report(parse_date(date_from), parse_date(date_to))
+    click.echo("Donations by category")
+    for row in report['donations_by_category']:
+        click.echo(f"  {row.month}  {row.category:<20} {row.donations:>6} received {row.donated or 0:>6} donated")
+    click.echo("Requests")
+    for row in report['requests']:
+        click.echo(f"  {row.month}  {row.requests:>6} received {row.fulfilled or 0:>6} fulfilled")
+    click.echo("Matches")
+    for row in report['matches']:
+        click.echo(f"  {row.month}  {row.matches:>6} matches, {row.avg_days_donation_to_match or 0:.1f} days from "
+                   f"donation on average (max {row.max_days_donation_to_match or 0:.1f}), "
+                   f"{row.avg_days_request_to_match or 0:.1f} days from request")
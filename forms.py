@@ -2,7 +2,8 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, TextAreaField, SelectField, PasswordField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Length, Email, ValidationError
-from models import User, Category
+from models import User
+from category_registry import categories
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
@@ -35,7 +36,7 @@ class DonationForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(DonationForm, self).__init__(*args, **kwargs)
-        self.category_id.choices = [(c.id, c.name) for c in Category.query.all()]
+        self.category_id.choices = categories.choices()
 
 class RequestForm(FlaskForm):
     title = StringField('Item Needed', validators=[DataRequired(), Length(max=100)])
@@ -51,7 +52,7 @@ class RequestForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(RequestForm, self).__init__(*args, **kwargs)
-        self.category_id.choices = [(c.id, c.name) for c in Category.query.all()]
+        self.category_id.choices = categories.choices()
 
 class ApprovalForm(FlaskForm):
     status = SelectField('Status', choices=[
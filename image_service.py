@@ -0,0 +1,104 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import click
+from PIL import Image, ImageOps, features
+from sqlalchemy import update
+from app import app, db
+from models import Donation
+from storage import get_photo_storage
+
+# Donation photos are resized off the request thread into fixed renditions so
+# listing pages never ship the original upload. Until a donation's renditions
+# exist (photo_processed_at is set) templates fall back to the original file.
+
+RENDITIONS = {
+    'thumb': (160, 160),   # related items sidebar, cropped square
+    'card': (640, 480),    # grid cards on /, /browse, portals
+    'detail': (1280, 1280),  # item page
+}
+RENDITION_DIR = 'renditions'
+RENDITION_FORMAT, RENDITION_EXT = ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+RENDITION_QUALITY = 82
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='photo-renditions')
+
+
+def rendition_name(photo_filename, size):
+    stem = os.path.splitext(photo_filename)[0]
+    return f'{RENDITION_DIR}/{stem}-{size}.{RENDITION_EXT}'
+
+
+def render_photo(photo_filename, storage):
+    """Write every rendition for one upload through the storage backend; EXIF and other metadata are dropped"""
+    targets = {size: rendition_name(photo_filename, size) for size in RENDITIONS}
+    if all(storage.exists(target) for target in targets.values()):
+        # Deduplicated upload whose renditions were already produced
+        return
+    with storage.open(photo_filename) as source, Image.open(source) as original:
+        # Apply the camera orientation before the EXIF block is discarded
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA') or (image.mode == 'RGBA' and RENDITION_FORMAT == 'JPEG'):
+            image = image.convert('RGB')
+        for size, box in RENDITIONS.items():
+            if size == 'thumb':
+                resized = ImageOps.fit(image, box, Image.LANCZOS)
+            else:
+                resized = image.copy()
+                resized.thumbnail(box, Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, RENDITION_FORMAT, quality=RENDITION_QUALITY, optimize=True)
+            storage.put(targets[size], buffer.getvalue())
+
+
+def _process(flask_app, donation_id, photo_filename):
+    with flask_app.app_context():
+        try:
+            render_photo(photo_filename, get_photo_storage())
+            db.session.execute(
+                update(Donation).where(Donation.id == donation_id).values(photo_processed_at=datetime.utcnow())
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            flask_app.logger.error(f"Failed to process photo for donation {donation_id}: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def queue_photo_processing(donation):
+    """Render a donation's photo in the background; call after the donation is committed"""
+    if donation.photo_filename:
+        _executor.submit(_process, app, donation.id, donation.photo_filename)
+
+
+@app.template_global()
+def photo_url(donation, size='card'):
+    """URL of the best available image for a donation at the given rendition size"""
+    storage = get_photo_storage()
+    if donation.photo_processed_at:
+        return storage.url(rendition_name(donation.photo_filename, size))
+    return storage.url(donation.photo_filename)
+
+
+@app.cli.command('process-photos')
+def process_photos():
+    """Render missing photo renditions for existing donations."""
+    pending = Donation.query.filter(
+        Donation.photo_filename.isnot(None), Donation.photo_processed_at.is_(None)
+    ).all()
+    storage = get_photo_storage()
+    processed = 0
+    for donation in pending:
+        try:
+            render_photo(donation.photo_filename, storage)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            # One unreadable or oversized upload must not stop the backfill
+            app.logger.warning(f"Skipping photo for donation {donation.id}: {str(e)}")
+            click.echo(f"Donation {donation.id}: {str(e)}", err=True)
+            continue
+        donation.photo_processed_at = datetime.utcnow()
+        db.session.commit()
+        processed += 1
+    click.echo(f"Processed {processed} of {len(pending)} photos")
@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+import click
+from sqlalchemy import insert
+from werkzeug.datastructures import MultiDict
+from app import app, db
+from models import User, Donation, Request
+from forms import DonationForm, RequestForm
+from category_registry import categories
+from stats_service import record_donation_created, record_request_created
+from notification_service import notify_admins
+from cache import invalidate as invalidate_pages
+
+# Bulk import for partner drives. Files are read one record at a time and
+# inserted in chunks with a single executemany per chunk, so memory stays flat
+# regardless of file size. Each record is validated by the same form class the
+# web page uses; a category may be given by name ("category") or id ("category_id").
+# Admins get one summary notification per import rather than one per item.
+
+IMPORT_BATCH_SIZE = 500
+
+IMPORT_KINDS = {
+    'donations': {
+        'model': Donation,
+        'form': DonationForm,
+        'fields': ('title', 'description', 'category_id'),
+        'owner_column': 'donor_id',
+        'record_created': lambda count: record_donation_created(count=count),
+    },
+    'requests': {
+        'model': Request,
+        'form': RequestForm,
+        'fields': ('title', 'description', 'category_id', 'urgency'),
+        'owner_column': 'requester_id',
+        'record_created': lambda count: record_request_created(count=count),
+    },
+}
+
+
+def iter_records(path, file_format):
+    """Yield (line number, record, error) for each record in a CSV or JSONL file"""
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        if file_format == 'csv':
+            # Line numbers count the header row
+            for line_no, row in enumerate(csv.DictReader(handle), start=2):
+                yield line_no, row, None
+            return
+        for line_no, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f'invalid JSON: {str(e)}'
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, 'expected a JSON object'
+                continue
+            yield line_no, record, None
+
+
+def category_lookup():
+    """Category name (case-insensitive) to id, built once per import"""
+    return {info.name.casefold(): info.id for info in categories.all()}
+
+
+def validate_record(form_class, fields, record, lookup):
+    """Run a record through the web form's validators; returns (values, errors)"""
+    data = {key: '' if value is None else str(value).strip() for key, value in record.items() if key}
+    if not data.get('category_id') and data.get('category'):
+        category_id = lookup.get(data['category'].casefold())
+        if category_id is None:
+            return None, [f'unknown category "{data["category"]}"']
+        data['category_id'] = str(category_id)
+
+    form = form_class(formdata=MultiDict(data), meta={'csrf': False})
+    if not form.validate():
+        return None, [f'{name}: {"; ".join(messages)}' for name, messages in form.errors.items()]
+    return {field: form[field].data for field in fields}, []
+
+
+def import_file(kind, path, owner, file_format, batch_size=IMPORT_BATCH_SIZE, dry_run=False, report=None):
+    """Validate and insert every record in path; returns (imported, rejected)"""
+    spec = IMPORT_KINDS[kind]
+    lookup = category_lookup()
+    imported = rejected = 0
+    batch = []
+
+    def flush():
+        nonlocal imported
+        if not batch:
+            return
+        if not dry_run:
+            db.session.execute(insert(spec['model']), batch)
+            spec['record_created'](len(batch))
+            db.session.commit()
+        imported += len(batch)
+        batch.clear()
+
+    for line_no, record, error in iter_records(path, file_format):
+        errors = [error] if error else []
+        values = None
+        if not errors:
+            values, errors = validate_record(spec['form'], spec['fields'], record, lookup)
+        if errors:
+            rejected += 1
+            if report:
+                report(line_no, errors)
+            continue
+        values[spec['owner_column']] = owner.id
+        batch.append(values)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    if imported and not dry_run:
+        notify_admins(
+            f'{kind.title()} Imported',
+            f'{imported} {kind} imported from {os.path.basename(path)} for {owner.username}'
+            + (f' ({rejected} rows rejected)' if rejected else '')
+        )
+        db.session.commit()
+        invalidate_pages('index', 'browse')
+    return imported, rejected
+
+
+def _run_import(kind, path, username, file_format, batch_size, dry_run):
+    owner = User.query.filter_by(username=username).first()
+    if owner is None:
+        raise click.BadParameter(f'no user named "{username}"', param_hint='--user')
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+
+    def report(line_no, errors):
+        click.echo(f"Line {line_no}: {', '.join(errors)}", err=True)
+
+    imported, rejected = import_file(kind, path, owner, file_format, batch_size, dry_run, report)
+    verb = 'Validated' if dry_run else 'Imported'
+    click.echo(f"{verb} {imported} {kind}, rejected {rejected}")
+
+
+def import_options(command):
+    command = click.option('--dry-run', is_flag=True, help='Validate the file without writing anything.')(command)
+    command = click.option('--batch-size', default=IMPORT_BATCH_SIZE, show_default=True, help='Rows per INSERT.')(command)
+    command = click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+                           help='File format; guessed from the extension when omitted.')(command)
+    command = click.option('--user', 'username', required=True, help='Username the items are recorded under.')(command)
+    return click.argument('path', type=click.Path(exists=True, dir_okay=False))(command)
+
+
+@app.cli.command('import-donations')
+@import_options
+def import_donations_command(path, username, file_format, batch_size, dry_run):
+    """Import pending donations (title, description, category) from CSV or JSONL."""
+    _run_import('donations', path, username, file_format, batch_size, dry_run)
+
+
+@app.cli.command('import-requests')
+@import_options
+def import_requests_command(path, username, file_format, batch_size, dry_run):
+    """Import active requests (title, description, category, urgency) from CSV or JSONL."""
+    _run_import('requests', path, username, file_format, batch_size, dry_run)
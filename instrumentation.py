@@ -0,0 +1,243 @@
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from bisect import bisect_left
+from flask import Response, abort, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+from app import app, db
+from db_profiles import pool_metrics
+
+# Opt-in request and SQL instrumentation (METRICS_ENABLED=1). Every request
+# records its latency, statement count and database time per endpoint, and
+# repeated identical SELECTs within one request are flagged as likely N+1
+# queries. /metrics serves the totals in Prometheus text format; each worker
+# process keeps its own totals, so scrape workers individually or aggregate.
+#
+# cProfile dumps are taken for a random PROFILE_SAMPLE_RATE share of requests
+# to PROFILE_ENDPOINTS, or on demand when an admin adds ?_profile=1 to a URL.
+# Open the .prof files with `python -m pstats` or snakeviz.
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram keyed by label values"""
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {key: (list(counts), total, amount) for key, (counts, total, amount) in self._series.items()}
+        for label_values, (counts, total, amount) in sorted(snapshot.items()):
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {total}')
+            lines.append(f'{self.name}_sum{{{labels}}} {amount}')
+            lines.append(f'{self.name}_count{{{labels}}} {total}')
+        return lines
+
+
+class CounterMetric:
+    """Monotonic counter keyed by label values"""
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = dict(self._values)
+        for label_values, value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{{{format_labels(self.labels, label_values)}}} {value}')
+        return lines
+
+
+def format_labels(names, values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+request_latency = Histogram(
+    'http_request_duration_seconds', 'Time spent handling a request.', ('endpoint', 'method'), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    'http_request_sql_statements', 'SQL statements executed per request.', ('endpoint',), QUERY_COUNT_BUCKETS
+)
+sql_time = CounterMetric('http_request_sql_seconds_total', 'Time spent executing SQL during requests.', ('endpoint',))
+responses = CounterMetric('http_responses_total', 'Responses sent, by status code.', ('endpoint', 'status'))
+n_plus_one = CounterMetric(
+    'http_request_n_plus_one_total', 'Requests that repeated one SELECT at least N_PLUS_ONE_THRESHOLD times.', ('endpoint',)
+)
+
+# Cumulative pool_metrics() fields, exported under Prometheus counter names (ending in _total)
+POOL_COUNTERS = {
+    'checkouts': 'db_pool_checkouts_total',
+    'timeouts': 'db_pool_timeouts_total',
+    'wait_total_seconds': 'db_pool_wait_seconds_total',
+}
+
+_profile_lock = threading.Lock()
+_reported_n_plus_one = set()
+
+
+def endpoint_label():
+    # Unmatched URLs share one label so scanners cannot grow the series without bound
+    return request.endpoint or 'unmatched'
+
+
+def _should_profile():
+    if request.args.get('_profile') == '1' and current_user.is_authenticated and current_user.is_admin:
+        return True
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    endpoints = app.config['PROFILE_ENDPOINTS']
+    return rate > 0 and (not endpoints or request.endpoint in endpoints) and random.random() < rate
+
+
+def _start_request():
+    g._metrics_started = time.perf_counter()
+    g._sql_statements = Counter()
+    g._sql_seconds = 0.0
+    g._profiler = None
+    # Only one profiler runs at a time per process
+    if _should_profile() and _profile_lock.acquire(blocking=False):
+        g._profiler = cProfile.Profile()
+        g._profiler.enable()
+
+
+def _finish_request(response):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = endpoint_label()
+    statements = g.pop('_sql_statements', Counter())
+    sql_seconds = g.pop('_sql_seconds', 0.0)
+
+    request_latency.observe((endpoint, request.method), elapsed)
+    request_queries.observe((endpoint,), sum(statements.values()))
+    sql_time.inc((endpoint,), sql_seconds)
+    responses.inc((endpoint, response.status_code))
+    response.headers['Server-Timing'] = f'app;dur={elapsed * 1000:.1f}, db;dur={sql_seconds * 1000:.1f}'
+
+    threshold = app.config['N_PLUS_ONE_THRESHOLD']
+    repeated = [(statement, count) for statement, count in statements.items()
+                if count >= threshold and statement.lstrip().upper().startswith('SELECT')]
+    if repeated:
+        n_plus_one.inc((endpoint,))
+        for statement, count in repeated:
+            # Log each pattern once per process; the counter keeps tracking occurrences
+            if (endpoint, statement) not in _reported_n_plus_one:
+                _reported_n_plus_one.add((endpoint, statement))
+                logger.warning(f"Possible N+1 in {endpoint}: statement ran {count} times: {statement[:200]}")
+
+    profiler = _stop_profiler()
+    if profiler is not None:
+        path = os.path.join(app.config['PROFILE_DIR'], f'{endpoint}-{int(time.time() * 1000)}.prof')
+        try:
+            os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+            profiler.dump_stats(path)
+            logger.info(f"Profile for {request.path} written to {path} ({elapsed * 1000:.0f} ms)")
+        except OSError as e:
+            logger.error(f"Failed to write profile {path}: {str(e)}")
+    return response
+
+
+def _stop_profiler():
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+    return profiler
+
+
+def _teardown_request(exc):
+    # after_request is skipped when a view raises; never leave the profiler running
+    _stop_profiler()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and '_sql_statements' in g:
+        # Kept on the execution context, which is discarded with a failed statement,
+        # rather than on the pooled connection, where it would outlive the error
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is not None and has_request_context() and '_sql_statements' in g:
+        g._sql_seconds += time.perf_counter() - started
+        g._sql_statements[statement] += 1
+
+
+def render_metrics():
+    lines = []
+    for metric in (request_latency, request_queries, sql_time, responses, n_plus_one):
+        lines.extend(metric.render())
+    pool = pool_metrics(db.engine)
+    if pool:
+        for name, value in sorted(pool.items()):
+            metric = POOL_COUNTERS.get(name)
+            kind = 'counter' if metric else 'gauge'
+            metric = metric or f'db_pool_{name}'
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.append(f'{metric} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics():
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def install():
+    """Register the request hooks, SQL listeners and /metrics endpoint"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+    app.add_url_rule('/metrics', 'metrics', metrics)
+
+
+if app.config['METRICS_ENABLED']:
+    install()
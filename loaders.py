@@ -0,0 +1,51 @@
+from sqlalchemy.orm import configure_mappers, joinedload, selectinload
+from models import Donation, Request, Match
+
+# Named eager-loading profiles, one per kind of list or detail view.
+# The relationships in models.py stay lazy; views opt in to exactly what their
+# templates touch so a page renders in a fixed number of statements.
+
+_profiles = None
+
+
+def _build_profiles():
+    # Backref attributes (Donation.category, Donation.donor, ...) only exist once mappers are configured
+    configure_mappers()
+    return {
+        # Cards on the landing page, /browse, related items and the donor portal.
+        # Category names come from the category registry, so cards need nothing extra
+        'donation_card': (),
+        # Admin review queue shows who donated as well
+        'donation_admin': (
+            joinedload(Donation.donor),
+        ),
+        # Item page: people involved plus the requests it was matched to
+        'donation_detail': (
+            joinedload(Donation.donor),
+            joinedload(Donation.approved_by),
+            selectinload(Donation.matches).joinedload(Match.request),
+        ),
+        'request_card': (),
+        'request_admin': (
+            joinedload(Request.requester),
+        ),
+        # Admin recent matches table
+        'match_row': (
+            joinedload(Match.donation).joinedload(Donation.donor),
+            joinedload(Match.request).joinedload(Request.requester),
+            joinedload(Match.matched_by),
+        ),
+    }
+
+
+def loader_options(profile):
+    """Return the loader options for a named profile"""
+    global _profiles
+    if _profiles is None:
+        _profiles = _build_profiles()
+    return _profiles[profile]
+
+
+def with_profile(query, profile):
+    """Apply a named eager-loading profile to a query"""
+    return query.options(*loader_options(profile))
@@ -1,4 +1,10 @@
-from app import app  # noqa: F401
+from app import create_app
+from bootstrap import init_database
+
+app = create_app()
 
 if __name__ == '__main__':
+    # The development server sets up the database itself; deployments run `flask init-db`
+    with app.app_context():
+        init_database()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,251 @@
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+import click
+from app import app, db
+from models import Donation, Request
+from notification_service import notify_admins
+
+# Scores donation/request pairs from category, title/description similarity,
+# request urgency and how long the request has been waiting. Candidates come
+# from an in-memory inverted index over approved donations and active requests,
+# updated as items are approved or matched and rebuilt from the database every
+# INDEX_TTL seconds so other workers' changes are picked up.
+
+WEIGHTS = {'category': 0.5, 'text': 0.3, 'urgency': 0.15, 'age': 0.05}
+URGENCY_SCORES = {'low': 0.0, 'normal': 0.33, 'high': 0.67, 'urgent': 1.0}
+AGE_HORIZON_DAYS = 30  # requests waiting this long get the full age score
+MIN_SCORE = 0.3  # below this a pair is not worth an admin's attention
+INDEX_TTL = 300  # seconds
+
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have i in is it its my of on or our so that the their this to
+    was we were with you your any some need needs needed looking would like please item items
+""".split())
+
+
+def tokenize(*texts):
+    """Lower-cased, de-pluralized content words from the given texts"""
+    tokens = set()
+    for text in texts:
+        for word in re.findall(r'[a-z0-9]+', (text or '').lower()):
+            if len(word) < 2 or word in STOPWORDS:
+                continue
+            if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+                word = word[:-1]
+            tokens.add(word)
+    return frozenset(tokens)
+
+
+class _InvertedIndex:
+    """Token and category postings for one kind of item"""
+
+    def __init__(self):
+        self.entries = {}
+        self.postings = defaultdict(set)
+        self.by_category = defaultdict(set)
+        # IDF weights and token-set norms depend on the whole index, so they are memoized until it changes
+        self._weights = {}
+        self._norms = {}
+
+    def add(self, item_id, category_id, tokens, **attrs):
+        self.remove(item_id)
+        self._weights.clear()
+        self._norms.clear()
+        self.entries[item_id] = dict(attrs, category_id=category_id, tokens=tokens)
+        self.by_category[category_id].add(item_id)
+        for token in tokens:
+            self.postings[token].add(item_id)
+
+    def remove(self, item_id):
+        entry = self.entries.pop(item_id, None)
+        if entry is None:
+            return
+        self._weights.clear()
+        self._norms.clear()
+        self.by_category[entry['category_id']].discard(item_id)
+        for token in entry['tokens']:
+            self.postings[token].discard(item_id)
+            if not self.postings[token]:
+                del self.postings[token]
+
+    def candidates(self, category_id, tokens):
+        found = set(self.by_category.get(category_id, ()))
+        for token in tokens:
+            found |= self.postings.get(token, set())
+        return found
+
+    def idf(self, token):
+        return math.log((len(self.entries) + 1) / (len(self.postings.get(token, ())) + 1)) + 1
+
+    def weight(self, token):
+        weight = self._weights.get(token)
+        if weight is None:
+            weight = self._weights[token] = self.idf(token) ** 2
+        return weight
+
+    def norm(self, tokens):
+        norm = self._norms.get(tokens)
+        if norm is None:
+            norm = self._norms[tokens] = math.sqrt(sum(self.weight(token) for token in tokens))
+        return norm
+
+
+class MatchingEngine:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._requests = _InvertedIndex()
+        self._donations = _InvertedIndex()
+        self._built_at = None
+
+    def rebuild(self):
+        """Reload both indexes from approved donations and active requests"""
+        requests, donations = _InvertedIndex(), _InvertedIndex()
+        request_rows = db.session.query(
+            Request.id, Request.title, Request.description, Request.category_id, Request.urgency, Request.created_at
+        ).filter_by(status='active').yield_per(1000)
+        for row in request_rows:
+            requests.add(row.id, row.category_id, tokenize(row.title, row.description),
+                         urgency=row.urgency, created_at=row.created_at)
+        donation_rows = db.session.query(
+            Donation.id, Donation.title, Donation.description, Donation.category_id
+        ).filter_by(status='approved').yield_per(1000)
+        for row in donation_rows:
+            donations.add(row.id, row.category_id, tokenize(row.title, row.description))
+        with self._lock:
+            self._requests, self._donations = requests, donations
+            self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._built_at is None or time.monotonic() - self._built_at > INDEX_TTL:
+            self.rebuild()
+
+    def add_request(self, item_request):
+        with self._lock:
+            if self._built_at is not None:
+                self._requests.add(item_request.id, item_request.category_id,
+                                   tokenize(item_request.title, item_request.description),
+                                   urgency=item_request.urgency, created_at=item_request.created_at)
+
+    def add_donation(self, donation):
+        with self._lock:
+            if self._built_at is not None:
+                self._donations.add(donation.id, donation.category_id, tokenize(donation.title, donation.description))
+
+    def remove_request(self, request_id):
+        with self._lock:
+            self._requests.remove(request_id)
+
+    def remove_donation(self, donation_id):
+        with self._lock:
+            self._donations.remove(donation_id)
+
+    @staticmethod
+    def _text_similarity(index, a, b):
+        """IDF-weighted cosine similarity of two token sets"""
+        shared = a & b
+        if not shared:
+            return 0.0
+        return sum(index.weight(token) for token in shared) / (index.norm(a) * index.norm(b))
+
+    @staticmethod
+    def _request_score(request_entry, now):
+        """Urgency and age share of the score, which depends on the request alone"""
+        age_days = (now - request_entry['created_at']).total_seconds() / 86400 if request_entry['created_at'] else 0
+        return (WEIGHTS['urgency'] * URGENCY_SCORES.get(request_entry['urgency'], URGENCY_SCORES['normal'])
+                + WEIGHTS['age'] * min(max(age_days, 0) / AGE_HORIZON_DAYS, 1.0))
+
+    def _pair_score(self, index, donation_category, donation_tokens, request_entry, request_tokens, request_score):
+        category = WEIGHTS['category'] if donation_category == request_entry['category_id'] else 0.0
+        return request_score + category + WEIGHTS['text'] * self._text_similarity(index, donation_tokens, request_tokens)
+
+    def score(self, index, donation_category, donation_tokens, request_entry, request_tokens, now=None):
+        """Weighted 0..1 score for one donation/request pair"""
+        request_score = self._request_score(request_entry, now or datetime.utcnow())
+        return self._pair_score(index, donation_category, donation_tokens, request_entry, request_tokens, request_score)
+
+    def rank_requests_for_donation(self, donation, limit=None):
+        """Active requests a donation could fill, as [(request_id, score)] best first"""
+        tokens = tokenize(donation.title, donation.description)
+        now = datetime.utcnow()
+        with self._lock:
+            self._ensure_fresh()
+            index = self._requests
+            ranked = []
+            for request_id in index.candidates(donation.category_id, tokens):
+                entry = index.entries[request_id]
+                score = self._pair_score(index, donation.category_id, tokens, entry, entry['tokens'],
+                                         self._request_score(entry, now))
+                if score >= MIN_SCORE:
+                    ranked.append((request_id, score))
+        ranked.sort(key=lambda pair: (-pair[1], pair[0]))
+        return ranked[:limit] if limit else ranked
+
+    def rank_donations_for_request(self, item_request, limit=None):
+        """Approved donations that could fill a request, as [(donation_id, score)] best first"""
+        tokens = tokenize(item_request.title, item_request.description)
+        entry = {'category_id': item_request.category_id, 'urgency': item_request.urgency,
+                 'created_at': item_request.created_at}
+        request_score = self._request_score(entry, datetime.utcnow())
+        with self._lock:
+            self._ensure_fresh()
+            index = self._donations
+            ranked = []
+            for donation_id in index.candidates(item_request.category_id, tokens):
+                donation_entry = index.entries[donation_id]
+                score = self._pair_score(index, donation_entry['category_id'], donation_entry['tokens'],
+                                         entry, tokens, request_score)
+                if score >= MIN_SCORE:
+                    ranked.append((donation_id, score))
+        ranked.sort(key=lambda pair: (-pair[1], pair[0]))
+        return ranked[:limit] if limit else ranked
+
+
+engine = MatchingEngine()
+
+
+def candidate_donations(requests, limit=5):
+    """Map request id -> [(donation, score)] for a page of requests, loading all donations in one query"""
+    ranked = {item_request.id: engine.rank_donations_for_request(item_request, limit) for item_request in requests}
+    donation_ids = {donation_id for pairs in ranked.values() for donation_id, _ in pairs}
+    donations = {}
+    if donation_ids:
+        # The index may lag other workers, so only still-approved donations are offered
+        donations = {
+            donation.id: donation
+            for donation in Donation.query.filter(Donation.id.in_(donation_ids), Donation.status == 'approved')
+        }
+    return {
+        request_id: [(donations[donation_id], score) for donation_id, score in pairs if donation_id in donations]
+        for request_id, pairs in ranked.items()
+    }
+
+
+def rematch_backlog(limit=3):
+    """Rebuild the index and rank donations for every active request; yields (request, [(donation_id, score)])"""
+    engine.rebuild()
+    for item_request in Request.query.filter_by(status='active').order_by(Request.created_at).yield_per(500):
+        ranked = engine.rank_donations_for_request(item_request, limit)
+        if ranked:
+            yield item_request, ranked
+
+
+@app.cli.command('rematch')
+@click.option('--limit', default=3, show_default=True, help='Candidates listed per request.')
+@click.option('--notify', is_flag=True, help='Send admins a summary notification.')
+def rematch_command(limit, notify):
+    """Score every active request against all approved donations."""
+    matched = 0
+    for item_request, ranked in rematch_backlog(limit):
+        matched += 1
+        candidates = ', '.join(f'#{donation_id} ({score:.2f})' for donation_id, score in ranked)
+        click.echo(f'Request #{item_request.id} "{item_request.title}": {candidates}')
+    click.echo(f'{matched} active requests have candidate donations')
+    if notify and matched:
+        noun = 'request has' if matched == 1 else 'requests have'
+        notify_admins('Match Candidates Ready', f'{matched} active {noun} ranked donation candidates. '
+                      'Open Active Requests in the admin dashboard to review them.')
+        db.session.commit()
@@ -0,0 +1,76 @@
+import click
+from sqlalchemy import func, inspect, text
+from app import app, db
+from models import Match
+
+# db.create_all() only creates missing tables, so columns and indexes declared on
+# existing tables never reach an older database. upgrade_schema() adds them in place.
+
+
+def find_duplicate_matches():
+    """(donation_id, request_id) pairs recorded more than once"""
+    return db.session.query(Match.donation_id, Match.request_id, func.count(Match.id)).group_by(
+        Match.donation_id, Match.request_id
+    ).having(func.count(Match.id) > 1).all()
+
+
+def add_missing_columns(inspector, table):
+    """ALTER TABLE ... ADD COLUMN for nullable columns the table lacks; returns their names"""
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    added = []
+    preparer = db.engine.dialect.identifier_preparer
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        if not column.nullable:
+            app.logger.error(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+            continue
+        column_type = column.type.compile(dialect=db.engine.dialect)
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}"
+            ))
+        added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def upgrade_schema():
+    """Create declared columns and indexes missing from the live database; returns (created, skipped) names"""
+    created, skipped = [], []
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        created.extend(add_missing_columns(inspector, table))
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name in existing:
+                continue
+            if table.name == Match.__tablename__ and index.unique:
+                duplicates = find_duplicate_matches()
+                if duplicates:
+                    app.logger.error(
+                        f"Not creating {index.name}: {len(duplicates)} duplicate donation/request pairs in match"
+                    )
+                    skipped.append(index.name)
+                    continue
+            index.create(db.engine)
+            created.append(index.name)
+
+    if created:
+        app.logger.info(f"Schema upgraded: {', '.join(created)}")
+    return created, skipped
+
+
+@app.cli.command('upgrade-schema')
+def upgrade_schema_command():
+    """Add columns, indexes and constraints that db.create_all() cannot add to existing tables."""
+    created, skipped = upgrade_schema()
+    for name in created:
+        click.echo(f"Created {name}")
+    for name in skipped:
+        click.echo(f"Skipped {name}: remove duplicate matches and run again", err=True)
+    if not created and not skipped:
+        click.echo("Schema is up to date")
@@ -1,7 +1,7 @@
 from datetime import datetime
 from app import db
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from password_service import hash_password, verify_password
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,6 +10,8 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(256))
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Denormalized count of unread notifications, kept by notification_service
+    unread_notifications = db.Column(db.Integer, default=0)
     
     # Relationships
     donations = db.relationship('Donation', foreign_keys='Donation.donor_id', backref='donor', lazy=True)
@@ -19,10 +21,10 @@ class User(UserMixin, db.Model):
     notifications = db.relationship('Notification', backref='user', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -45,10 +47,13 @@ class Donation(db.Model):
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
     photo_filename = db.Column(db.String(255))
+    photo_processed_at = db.Column(db.DateTime)  # set once resized renditions exist
     status = db.Column(db.String(20), default='pending')  # pending, approved, donated, rejected
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     approved_at = db.Column(db.DateTime)
     donated_at = db.Column(db.DateTime)
+    # Row version for API validators; onupdate also fires for Core update() statements
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     thank_you_sent = db.Column(db.Boolean, default=False)
     
     # Foreign keys
@@ -59,6 +64,15 @@ class Donation(db.Model):
     # Relationships
     matches = db.relationship('Match', backref='donation', lazy=True)
 
+    # Indexes follow the route query shapes: filter columns first, then the sort key and id for keyset paging
+    __table_args__ = (
+        db.Index('ix_donation_status_approved_at', 'status', 'approved_at', 'id'),
+        db.Index('ix_donation_status_category_approved_at', 'status', 'category_id', 'approved_at', 'id'),
+        db.Index('ix_donation_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_donation_donor_created_at', 'donor_id', 'created_at', 'id'),
+        db.Index('ix_donation_updated_at', 'updated_at'),
+    )
+
     def __repr__(self):
         return f'<Donation {self.title}>'
 
@@ -78,6 +92,13 @@ class Request(db.Model):
     # Relationships
     matches = db.relationship('Match', backref='request', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_request_status_urgency_created_at', 'status', 'urgency', 'created_at'),
+        db.Index('ix_request_status_category_created_at', 'status', 'category_id', 'created_at'),
+        db.Index('ix_request_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_request_requester_created_at', 'requester_id', 'created_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<Request {self.title}>'
 
@@ -94,6 +115,13 @@ class Match(db.Model):
     
     # Relationships (backref handled in User model)
 
+    # A unique index rather than a constraint so it can be added to existing SQLite databases
+    __table_args__ = (
+        db.Index('uq_match_donation_request', 'donation_id', 'request_id', unique=True),
+        db.Index('ix_match_request_id', 'request_id'),
+        db.Index('ix_match_created_at', 'created_at'),
+    )
+
     def __repr__(self):
         return f'<Match {self.id}>'
 
@@ -110,5 +138,52 @@ class Notification(db.Model):
     
     # Relationships (backref handled in User model)
 
+    __table_args__ = (
+        db.Index('ix_notification_user_read_created_at', 'user_id', 'is_read', 'created_at'),
+        # Inbox pages walk a user's notifications newest first
+        db.Index('ix_notification_user_created_at', 'user_id', 'created_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<Notification {self.title}>'
+
+class NotificationArchive(db.Model):
+    # Old read notifications moved out of the live table by the retention job
+    id = db.Column(db.Integer, primary_key=True)  # id the row had in notification
+    title = db.Column(db.String(100), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    type = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<NotificationArchive {self.title}>'
+
+class EmailOutbox(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    recipients = db.Column(db.Text, nullable=False)  # comma separated addresses
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.status}>'
+
+class StatCounter(db.Model):
+    # Maintained totals for the admin dashboard, updated in the same transaction as the rows they count
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<StatCounter {self.name}={self.value}>'
@@ -0,0 +1,203 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import click
+from flask import g
+from flask_login import current_user
+from sqlalchemy import case, event, func, insert, inspect, select, update
+from app import app, db
+from models import User, Notification, NotificationArchive
+
+# Admin IDs rarely change, so they are cached per process and refreshed on change or after the TTL
+ADMIN_IDS_TTL = 300  # seconds
+
+_admin_ids = None
+_admin_ids_loaded_at = 0.0
+_admin_ids_lock = threading.Lock()
+
+# Number of request titles listed in a potential match digest before it is summarized
+DIGEST_TITLE_LIMIT = 5
+
+# Read notifications older than this are moved to notification_archive by `flask archive-notifications`
+RETENTION_DAYS = 90
+ARCHIVE_BATCH_SIZE = 500
+
+# Every write to notification.is_read or a new notification adjusts user.unread_notifications
+# in the same transaction, so the navbar badge reads one column instead of counting rows.
+
+
+def get_admin_ids():
+    """Return the cached tuple of admin user IDs, loading it when missing or stale"""
+    global _admin_ids, _admin_ids_loaded_at
+    with _admin_ids_lock:
+        if _admin_ids is None or time.monotonic() - _admin_ids_loaded_at > ADMIN_IDS_TTL:
+            _admin_ids = tuple(
+                user_id for (user_id,) in db.session.query(User.id).filter_by(is_admin=True).order_by(User.id)
+            )
+            _admin_ids_loaded_at = time.monotonic()
+        return _admin_ids
+
+
+def invalidate_admin_ids():
+    """Drop the cached admin IDs so the next lookup reloads them"""
+    global _admin_ids
+    with _admin_ids_lock:
+        _admin_ids = None
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_delete')
+def _admin_added_or_removed(mapper, connection, target):
+    if target.is_admin:
+        invalidate_admin_ids()
+
+
+@event.listens_for(User, 'after_update')
+def _admin_flag_changed(mapper, connection, target):
+    if inspect(target).attrs.is_admin.history.has_changes():
+        invalidate_admin_ids()
+
+
+def notify_users(user_ids, title, message, type='info'):
+    """Write the same notification for every user in one multi-row INSERT"""
+    rows = [
+        {'title': title, 'message': message, 'type': type, 'user_id': user_id}
+        for user_id in user_ids
+    ]
+    if rows:
+        db.session.execute(insert(Notification).values(rows))
+        db.session.execute(
+            update(User).where(User.id.in_(set(user_ids)))
+            .values(unread_notifications=func.coalesce(User.unread_notifications, 0) + 1)
+        )
+    return len(rows)
+
+
+def notify_user(user_id, title, message, type='info'):
+    """Notify a single user; the caller commits"""
+    return notify_users([user_id], title, message, type)
+
+
+def notify_admins(title, message, type='info'):
+    """Notify every admin; the caller commits"""
+    return notify_users(get_admin_ids(), title, message, type)
+
+
+def notify_potential_matches(donation, request_titles, total):
+    """Send admins a single digest listing the active requests a donation may match"""
+    if not total:
+        return 0
+    listed = ', '.join(f'"{title}"' for title in request_titles[:DIGEST_TITLE_LIMIT])
+    if total > DIGEST_TITLE_LIMIT:
+        listed += f' and {total - DIGEST_TITLE_LIMIT} more'
+    noun = 'request' if total == 1 else 'requests'
+    message = f'Donation "{donation.title}" may match {total} active {noun}: {listed}'
+    return notify_admins('Potential Match Found', message)
+
+
+def mark_read(user_id, notification_id):
+    """Mark one of the user's notifications read; returns False if it already was"""
+    result = db.session.execute(
+        update(Notification)
+        .where(Notification.id == notification_id, Notification.user_id == user_id, Notification.is_read.is_(False))
+        .values(is_read=True)
+    )
+    if result.rowcount:
+        db.session.execute(
+            update(User).where(User.id == user_id, User.unread_notifications > 0)
+            .values(unread_notifications=User.unread_notifications - 1)
+        )
+    return bool(result.rowcount)
+
+
+def mark_all_read(user_id):
+    """Mark every unread notification of the user read in one UPDATE; returns how many changed"""
+    result = db.session.execute(
+        update(Notification)
+        .where(Notification.user_id == user_id, Notification.is_read.is_(False))
+        .values(is_read=True)
+    )
+    read = result.rowcount
+    if read:
+        # Subtract what was marked rather than zeroing, so a notification inserted
+        # after the UPDATE above keeps its increment
+        db.session.execute(
+            update(User).where(User.id == user_id)
+            .values(unread_notifications=case(
+                (User.unread_notifications > read, User.unread_notifications - read), else_=0
+            ))
+        )
+    return read
+
+
+def unread_count_subquery():
+    return (
+        select(func.count(Notification.id))
+        .where(Notification.user_id == User.id, Notification.is_read.is_(False))
+        .scalar_subquery()
+    )
+
+
+def rebuild_unread_counts(only_missing=False):
+    """Recount unread notifications per user with one correlated UPDATE; the caller commits"""
+    statement = update(User).values(unread_notifications=unread_count_subquery())
+    if only_missing:
+        statement = statement.where(User.unread_notifications.is_(None))
+    return db.session.execute(statement).rowcount
+
+
+def get_unread_count(user_id):
+    return db.session.query(User.unread_notifications).filter(User.id == user_id).scalar() or 0
+
+
+@app.template_global()
+def unread_notification_count():
+    """Unread count for the signed-in user, read at most once per request"""
+    if not current_user.is_authenticated:
+        return 0
+    if 'unread_notifications' not in g:
+        g.unread_notifications = get_unread_count(current_user.id)
+    return g.unread_notifications
+
+
+def archive_read_notifications(older_than_days=RETENTION_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Move read notifications older than the cutoff to the archive, one committed batch at a time"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = 0
+    last_id = 0
+    while True:
+        ids = [
+            notification_id for (notification_id,) in db.session.query(Notification.id).filter(
+                Notification.id > last_id, Notification.is_read.is_(True), Notification.created_at < cutoff
+            ).order_by(Notification.id).limit(batch_size)
+        ]
+        if not ids:
+            return archived
+        columns = ['id', 'title', 'message', 'type', 'created_at', 'user_id']
+        db.session.execute(
+            insert(NotificationArchive).from_select(
+                columns,
+                select(*[getattr(Notification, name) for name in columns]).where(Notification.id.in_(ids))
+            )
+        )
+        db.session.execute(Notification.__table__.delete().where(Notification.id.in_(ids)))
+        db.session.commit()
+        archived += len(ids)
+        last_id = ids[-1]
+
+
+@app.cli.command('archive-notifications')
+@click.option('--days', default=RETENTION_DAYS, show_default=True, help='Archive read notifications older than this.')
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, show_default=True)
+def archive_notifications_command(days, batch_size):
+    """Move old read notifications to the archive table in batches."""
+    archived = archive_read_notifications(days, batch_size)
+    click.echo(f"Archived {archived} notifications")
+
+
+@app.cli.command('rebuild-unread-counts')
+def rebuild_unread_counts_command():
+    """Recount every user's unread notifications."""
+    updated = rebuild_unread_counts()
+    db.session.commit()
+    click.echo(f"Updated {updated} users")
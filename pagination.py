@@ -0,0 +1,130 @@
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from numbers import Number
+from sqlalchemy import literal, tuple_
+
+# Keyset (cursor) pagination: each page is fetched with a WHERE on the sort key of
+# the previous page's edge row, so page 500 costs the same index range scan as page 1.
+
+COUNT_CACHE_TTL = 60  # seconds
+COUNT_CACHE_SIZE = 512
+
+_count_cache = {}
+_count_cache_lock = threading.Lock()
+
+
+class KeysetPage:
+    """One page of results plus opaque cursors for its neighbours"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(values, direction):
+    payload = {
+        'd': direction,
+        'k': [['dt', v.isoformat()] if isinstance(v, datetime) else ['v', v] for v in values]
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (key values, direction); malformed cursors fall back to the first page"""
+    if not cursor:
+        return None, 'next'
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [datetime.fromisoformat(v) if kind == 'dt' else v for kind, v in payload['k']]
+        direction = 'prev' if payload.get('d') == 'prev' else 'next'
+        return values, direction
+    except (ValueError, TypeError, KeyError):
+        return None, 'next'
+
+
+def _fits_key(value, key):
+    """Whether a decoded cursor value can be bound against key's column type"""
+    if value is None:
+        return True
+    try:
+        expected = key.type.python_type
+    except NotImplementedError:  # untyped expressions, such as a relevance score
+        expected = Number
+    if issubclass(expected, Number):
+        return isinstance(value, Number) and not isinstance(value, bool)
+    return isinstance(value, expected)
+
+
+def keyset_paginate(query, keys, cursor=None, per_page=20, descending=True, total=None):
+    """Page through query ordered by keys (all in the same direction; the last key must be unique)"""
+    values, direction = decode_cursor(cursor)
+    # A cursor that decodes but does not fit the keys (edited by hand, or from an
+    # older sort) starts over rather than failing to bind
+    if values is not None and (len(values) != len(keys) or not all(map(_fits_key, values, keys))):
+        values, direction = None, 'next'
+    forward = direction == 'next'
+    # Walking backwards flips the comparison and the sort, then the rows are reversed
+    scan_descending = descending == forward
+
+    if values is not None:
+        row = tuple_(*keys)
+        bound = tuple_(*[literal(value, key.type) for key, value in zip(keys, values)])
+        query = query.filter(row < bound if scan_descending else row > bound)
+
+    query = query.add_columns(*keys).order_by(*[key.desc() if scan_descending else key.asc() for key in keys])
+    rows = query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    has_next = more if forward else values is not None
+    has_prev = values is not None if forward else more
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(list(rows[-1][1:]), 'next')
+    if rows and has_prev:
+        prev_cursor = encode_cursor(list(rows[0][1:]), 'prev')
+
+    return KeysetPage([row[0] for row in rows], next_cursor, prev_cursor, total)
+
+
+def cached_count(key, query, ttl=COUNT_CACHE_TTL):
+    """COUNT(*) for query, reused for ttl seconds under key; totals on paged views may lag slightly"""
+    now = time.monotonic()
+    with _count_cache_lock:
+        hit = _count_cache.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+
+    count = query.order_by(None).count()
+
+    with _count_cache_lock:
+        if len(_count_cache) >= COUNT_CACHE_SIZE:
+            # Drop expired entries first, then the oldest ones
+            for stale in [k for k, (expires, _) in _count_cache.items() if expires <= now]:
+                del _count_cache[stale]
+            while len(_count_cache) >= COUNT_CACHE_SIZE:
+                del _count_cache[next(iter(_count_cache))]
+        _count_cache[key] = (now + ttl, count)
+    return count
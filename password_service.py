@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import click
+from werkzeug.security import generate_password_hash, check_password_hash
+from app import app
+
+# Password hashing with a configurable method and cost. Werkzeug stores the
+# method and its parameters in front of every hash (e.g. "scrypt:32768:8:1$..."),
+# so hashes made under older settings are recognised and upgraded at login.
+# Hashing can optionally run on a small bounded pool: it caps how many CPU-heavy
+# hashes run at once during signup bursts, and hashlib releases the GIL while
+# hashing, so request threads are not serialised behind it.
+
+_pool = None
+_pool_lock = threading.Lock()
+_method_prefixes = {}
+
+
+def hash_method():
+    return app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+
+
+def _get_pool():
+    global _pool
+    workers = app.config.get('PASSWORD_HASH_WORKERS', 0)
+    if not workers:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                executor = ProcessPoolExecutor if app.config.get('PASSWORD_HASH_POOL') == 'process' else ThreadPoolExecutor
+                _pool = executor(max_workers=workers)
+    return _pool
+
+
+def _run(func, *args):
+    pool = _get_pool()
+    if pool is None:
+        return func(*args)
+    return pool.submit(func, *args).result()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, hash_method())
+
+
+def verify_password(password_hash, password):
+    if not password_hash:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+def method_prefix(method):
+    """The method string werkzeug stores for method, with defaults filled in"""
+    prefix = _method_prefixes.get(method)
+    if prefix is None:
+        prefix = _method_prefixes[method] = generate_password_hash('', method).split('$', 1)[0]
+    return prefix
+
+
+def needs_rehash(password_hash):
+    """True when the hash was made with a different method or cost than configured"""
+    return bool(password_hash) and password_hash.split('$', 1)[0] != method_prefix(hash_method())
+
+
+def _logins_per_second(password_hash, duration, threads):
+    deadline = time.perf_counter() + duration
+    counts = [0] * threads
+
+    def worker(slot):
+        while time.perf_counter() < deadline:
+            check_password_hash(password_hash, 'benchmark-password')
+            counts[slot] += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(slot,)) for slot in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - started)
+
+
+@app.cli.command('bench-passwords')
+@click.option('--method', default=None, help='Hash method to measure, e.g. scrypt:16384:8:1 or pbkdf2:sha256:600000.')
+@click.option('--duration', default=3.0, show_default=True, help='Seconds to run each measurement.')
+@click.option('--threads', default=os.cpu_count() or 1, show_default=True, help='Threads for the concurrent run.')
+def bench_passwords(method, duration, threads):
+    """Measure password verifications per second for a hash method."""
+    method = method or hash_method()
+    password_hash = generate_password_hash('benchmark-password', method)
+    click.echo(f"Method: {password_hash.split('$', 1)[0]}")
+    single = _logins_per_second(password_hash, duration, 1)
+    click.echo(f"1 thread: {single:.1f} logins/sec per core ({1000 / single:.1f} ms each)")
+    if threads > 1:
+        total = _logins_per_second(password_hash, duration, threads)
+        click.echo(f"{threads} threads: {total:.1f} logins/sec total, {total / threads:.1f} per thread")
@@ -1,95 +1,107 @@
-import os
-from datetime import datetime, date
-from flask import render_template, flash, redirect, url_for, request, current_app
+from datetime import date
+from flask import (render_template, flash, redirect, url_for, request, jsonify, abort, Response,
+                   stream_with_context)
 from flask_login import login_user, logout_user, current_user, login_required
-from werkzeug.utils import secure_filename
-from sqlalchemy import or_, and_, func
+from sqlalchemy import and_, func
 from app import app, db
-from models import User, Category, Donation, Request, Match, Notification
+from models import User, Donation, Request, Match, Notification, EmailOutbox
 from forms import LoginForm, RegistrationForm, DonationForm, RequestForm, ApprovalForm, MatchForm, CategoryForm
-from email_service import send_thank_you_email, send_match_notification
+from search_service import apply_search
+from pagination import keyset_paginate, cached_count
+from loaders import with_profile
+from matching_engine import engine as match_engine, candidate_donations
+from image_service import queue_photo_processing
+from storage import get_photo_storage, send_photo
+from stats_service import get_dashboard_stats, record_donation_created, record_request_created
+from cache import cached_page, normalized_args, invalidate as invalidate_pages
+from date_filters import (RECENT_DAY_PRESETS, parse_date, date_range_bounds, recent_days_start, apply_date_range,
+                          month_start)
+from category_registry import categories
+from password_service import needs_rehash
+from db_profiles import pool_metrics
+from notification_service import notify_admins, mark_read, mark_all_read
+from exports import EXPORTS, EXPORT_FORMATS, export_statement, export_filters, generate_export, impact_report
+from workflows import review_donation, match_items, WorkflowError
+from api_service import (donation_summary, donation_detail, listing_versions, make_etag, last_modified,
+                         conditional_json, api_per_page)
 
 @app.route('/')
+@cached_page('index')
 def index():
-    recent_donations = Donation.query.filter_by(status='approved').order_by(Donation.approved_at.desc()).limit(6).all()
-    urgent_requests = Request.query.filter_by(status='active', urgency='urgent').order_by(Request.created_at.desc()).limit(3).all()
-    categories = Category.query.all()
-    return render_template('index.html', recent_donations=recent_donations, urgent_requests=urgent_requests, categories=categories)
+    recent_donations = with_profile(Donation.query, 'donation_card').filter_by(status='approved').order_by(Donation.approved_at.desc()).limit(6).all()
+    urgent_requests = with_profile(Request.query, 'request_card').filter_by(status='active', urgency='urgent').order_by(Request.created_at.desc()).limit(3).all()
+    return render_template('index.html', recent_donations=recent_donations, urgent_requests=urgent_requests, categories=categories.all())
 
-@app.route('/browse')
-def browse_donations():
-    page = request.args.get('page', 1, type=int)
-    per_page = 12  # Number of items per page
+def browse_query(args):
+    """Approved donations filtered the way /browse filters them; returns (query, relevance, count key)"""
+    query = with_profile(Donation.query, 'donation_card').filter_by(status='approved')
     
-    # Start with base query for approved donations
-    query = Donation.query.filter_by(status='approved')
-    
-    # Search by title or description
-    search_term = request.args.get('search', '').strip()
+    # Search by title or description through the full-text index
+    search_term = args.get('search', '').strip()
+    relevance = None
     if search_term:
-        query = query.filter(
-            or_(
-                Donation.title.ilike(f'%{search_term}%'),
-                Donation.description.ilike(f'%{search_term}%')
-            )
-        )
+        query, relevance = apply_search(query, search_term)
     
     # Filter by category
-    category_id = request.args.get('category', type=int)
+    category_id = args.get('category', type=int)
     if category_id:
-        query = query.filter_by(category_id=category_id)
+        query = query.filter(Donation.category_id == category_id)
     
     # Filter by items with photos
-    has_photo = request.args.get('has_photo')
+    has_photo = args.get('has_photo')
     if has_photo:
         query = query.filter(Donation.photo_filename.isnot(None))
     
-    # Date range filters
-    date_from = request.args.get('date_from')
-    date_to = request.args.get('date_to')
+    # Date range filters, applied as index-friendly bounds on approved_at
+    start, end = date_range_bounds(parse_date(args.get('date_from')), parse_date(args.get('date_to')))
+    days = args.get('days', type=int)
+    if days in RECENT_DAY_PRESETS:
+        recent_start = recent_days_start(days)
+        start = max(start, recent_start) if start else recent_start
+    query = apply_date_range(query, Donation.approved_at, start, end)
     
-    if date_from:
-        try:
-            from_date = datetime.strptime(date_from, '%Y-%m-%d').date()
-            query = query.filter(func.date(Donation.approved_at) >= from_date)
-        except ValueError:
-            pass
+    return query, relevance, ('browse', search_term, category_id, bool(has_photo), start, end)
+
+def browse_sort_keys(sort_option, relevance):
+    """Keyset sort keys and direction; searches default to relevance. Each sort ends on id so the cursor is unique"""
+    sort_option = sort_option or ('relevance' if relevance is not None else 'newest')
+    if sort_option == 'relevance' and relevance is not None:
+        return [relevance, Donation.id], True
+    if sort_option == 'oldest':
+        return [Donation.approved_at, Donation.id], False
+    if sort_option == 'title_asc':
+        return [Donation.title, Donation.id], False
+    if sort_option == 'title_desc':
+        return [Donation.title, Donation.id], True
+    # newest (default)
+    return [Donation.approved_at, Donation.id], True
+
+@app.route('/browse')
+@cached_page('browse')
+def browse_donations():
+    cursor = request.args.get('cursor')
+    per_page = 12  # Number of items per page
     
-    if date_to:
-        try:
-            to_date = datetime.strptime(date_to, '%Y-%m-%d').date()
-            query = query.filter(func.date(Donation.approved_at) <= to_date)
-        except ValueError:
-            pass
+    query, relevance, count_key = browse_query(request.args)
     
-    # Sorting
-    sort_option = request.args.get('sort', 'newest')
-    if sort_option == 'oldest':
-        query = query.order_by(Donation.approved_at.asc())
-    elif sort_option == 'title_asc':
-        query = query.order_by(Donation.title.asc())
-    elif sort_option == 'title_desc':
-        query = query.order_by(Donation.title.desc())
-    else:  # newest (default)
-        query = query.order_by(Donation.approved_at.desc())
-    
-    # Get total count for results summary
-    total_count = query.count()
-    
-    # Paginate results
-    pagination = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Get total count for results summary; cached briefly per filter combination
+    total_count = cached_count(count_key, query)
+    
+    keys, descending = browse_sort_keys(request.args.get('sort'), relevance)
+    pagination = keyset_paginate(query, keys, cursor, per_page, descending, total=total_count)
     donations = pagination.items
     
-    # Get all categories for filter dropdown
-    categories = Category.query.order_by(Category.name).all()
+    
+    # Filters carried over into the previous/next links
+    page_args = {k: v for k, v in request.args.items() if k not in ('cursor', 'page')}
     
     return render_template('browse_donations.html', 
                          donations=donations,
-                         categories=categories,
+                         categories=categories.by_name(),
                          total_count=total_count,
-                         pagination=pagination)
+                         pagination=pagination,
+                         page_args=page_args,
+                         day_presets=RECENT_DAY_PRESETS)
 
 
 
@@ -103,6 +115,10 @@ def login():
         if user is None or not user.check_password(form.password.data):
             flash('Invalid username or password', 'danger')
             return redirect(url_for('login'))
+        if needs_rehash(user.password_hash):
+            # Stored under older hashing settings; the plaintext is only available now
+            user.set_password(form.password.data)
+            db.session.commit()
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get('next')
         if not next_page or not next_page.startswith('/'):
@@ -132,9 +148,59 @@ def register():
 @app.route('/donor_portal')
 @login_required
 def donor_portal():
-    donations = Donation.query.filter_by(donor_id=current_user.id).order_by(Donation.created_at.desc()).all()
-    requests = Request.query.filter_by(requester_id=current_user.id).order_by(Request.created_at.desc()).all()
-    return render_template('donor_portal.html', donations=donations, requests=requests)
+    per_page = 24
+    donations = keyset_paginate(
+        with_profile(Donation.query, 'donation_card').filter_by(donor_id=current_user.id),
+        [Donation.created_at, Donation.id], request.args.get('donations_cursor'), per_page
+    )
+    requests = keyset_paginate(
+        with_profile(Request.query, 'request_card').filter_by(requester_id=current_user.id),
+        [Request.created_at, Request.id], request.args.get('requests_cursor'), per_page
+    )
+    
+    # Totals for the summary cards, one grouped query per table
+    donation_counts = dict(
+        db.session.query(Donation.status, func.count(Donation.id))
+        .filter_by(donor_id=current_user.id).group_by(Donation.status).all()
+    )
+    request_counts = dict(
+        db.session.query(Request.status, func.count(Request.id))
+        .filter_by(requester_id=current_user.id).group_by(Request.status).all()
+    )
+    stats = {
+        'total_donations': sum(donation_counts.values()),
+        'donated_items': donation_counts.get('donated', 0),
+        'total_requests': sum(request_counts.values()),
+        'fulfilled_requests': request_counts.get('fulfilled', 0)
+    }
+    
+    return render_template('donor_portal.html', donations=donations, requests=requests, stats=stats)
+
+@app.route('/notifications')
+@login_required
+def notifications():
+    unread_only = request.args.get('unread') == '1'
+    query = Notification.query.filter_by(user_id=current_user.id)
+    if unread_only:
+        query = query.filter_by(is_read=False)
+    page = keyset_paginate(query, [Notification.created_at, Notification.id], request.args.get('cursor'), 25)
+    return render_template('notifications.html', page=page, unread_only=unread_only)
+
+@app.route('/notifications/<int:id>/read', methods=['POST'])
+@login_required
+def mark_notification_read(id):
+    mark_read(current_user.id, id)
+    db.session.commit()
+    return redirect(url_for('notifications'))
+
+@app.route('/notifications/read_all', methods=['POST'])
+@login_required
+def mark_all_notifications_read():
+    count = mark_all_read(current_user.id)
+    db.session.commit()
+    if count:
+        flash(f'Marked {count} notification{"s" if count != 1 else ""} as read.', 'success')
+    return redirect(url_for('notifications'))
 
 @app.route('/admin')
 @login_required
@@ -143,25 +209,86 @@ def admin_dashboard():
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('index'))
     
-    pending_donations = Donation.query.filter_by(status='pending').order_by(Donation.created_at.desc()).all()
-    active_requests = Request.query.filter_by(status='active').order_by(Request.created_at.desc()).all()
-    recent_matches = Match.query.order_by(Match.created_at.desc()).limit(10).all()
+    per_page = 24
+    pending_donations = keyset_paginate(
+        with_profile(Donation.query, 'donation_admin').filter_by(status='pending'),
+        [Donation.created_at, Donation.id], request.args.get('donations_cursor'), per_page
+    )
+    active_requests = keyset_paginate(
+        with_profile(Request.query, 'request_admin').filter_by(status='active'),
+        [Request.created_at, Request.id], request.args.get('requests_cursor'), per_page
+    )
+    match_candidates = candidate_donations(active_requests.items)
+    recent_matches = with_profile(Match.query, 'match_row').order_by(Match.created_at.desc()).limit(10).all()
     
-    stats = {
-        'total_donations': Donation.query.count(),
-        'pending_donations': Donation.query.filter_by(status='pending').count(),
-        'approved_donations': Donation.query.filter_by(status='approved').count(),
-        'donated_items': Donation.query.filter_by(status='donated').count(),
-        'active_requests': Request.query.filter_by(status='active').count(),
-        'total_matches': Match.query.count()
-    }
+    stats = get_dashboard_stats()
     
     return render_template('admin_dashboard.html', 
                          pending_donations=pending_donations,
                          active_requests=active_requests,
+                         match_candidates=match_candidates,
                          recent_matches=recent_matches,
                          stats=stats)
 
+@app.route('/admin/outbox')
+@login_required
+def admin_outbox():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    
+    status = request.args.get('status')
+    query = EmailOutbox.query
+    if status:
+        query = query.filter_by(status=status)
+    messages = query.order_by(EmailOutbox.created_at.desc()).limit(100).all()
+    
+    status_counts = dict(
+        db.session.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all()
+    )
+    
+    return render_template('admin_outbox.html', messages=messages, status_counts=status_counts)
+
+@app.route('/admin/export/<kind>.<file_format>')
+@login_required
+def admin_export(kind, file_format):
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    if kind not in EXPORTS or file_format not in EXPORT_FORMATS:
+        abort(404)
+    
+    # Rows are streamed from a server-side cursor while the response is being sent
+    statement = export_statement(kind, **export_filters(request.args))
+    filename = f'{kind}-{date.today().isoformat()}.{file_format}'
+    return Response(stream_with_context(generate_export(statement, file_format)),
+                    mimetype=EXPORT_FORMATS[file_format],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/admin/reports/impact')
+@login_required
+def admin_impact_report():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    
+    # Defaults to the trailing twelve calendar months, the current one included
+    date_to = parse_date(request.args.get('date_to')) or date.today()
+    date_from = parse_date(request.args.get('date_from')) or month_start(date_to, months_back=11)
+    report = impact_report(date_from, date_to)
+    return render_template('admin_impact_report.html', report=report, date_from=date_from, date_to=date_to,
+                           export_kinds=list(EXPORTS), categories=categories.by_name())
+
+@app.route('/admin/db-pool')
+@login_required
+def admin_db_pool():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+    
+    # Metrics are per worker process
+    return jsonify(profile=app.config['DB_ENGINE_PROFILE'], pool=pool_metrics(db.engine))
+
 @app.route('/donate', methods=['GET', 'POST'])
 @login_required
 def donate_item():
@@ -174,28 +301,17 @@ def donate_item():
             donor_id=current_user.id
         )
         
-        # Handle file upload
+        # Handle file upload; stored under its content hash so repeats are deduplicated
         if form.photo.data:
-            filename = secure_filename(form.photo.data.filename)
-            # Add timestamp to avoid filename conflicts
-            filename = f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{filename}"
-            filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            form.photo.data.save(filepath)
-            donation.photo_filename = filename
+            donation.photo_filename = get_photo_storage().save(form.photo.data.stream, form.photo.data.filename)
         
         db.session.add(donation)
+        record_donation_created()
         db.session.commit()
+        queue_photo_processing(donation)
         
         # Create notification for admins
-        admins = User.query.filter_by(is_admin=True).all()
-        for admin in admins:
-            notification = Notification(
-                title='New Donation Submitted',
-                message=f'New donation "{donation.title}" by {current_user.username}',
-                type='info',
-                user_id=admin.id
-            )
-            db.session.add(notification)
+        notify_admins('New Donation Submitted', f'New donation "{donation.title}" by {current_user.username}')
         
         db.session.commit()
         flash('Thank you for your donation! It will be reviewed by our team.', 'success')
@@ -217,18 +333,13 @@ def request_item():
         )
         
         db.session.add(item_request)
+        record_request_created()
         db.session.commit()
+        match_engine.add_request(item_request)
+        invalidate_pages('index')
         
         # Create notification for admins
-        admins = User.query.filter_by(is_admin=True).all()
-        for admin in admins:
-            notification = Notification(
-                title='New Item Request',
-                message=f'New request "{item_request.title}" by {current_user.username}',
-                type='info',
-                user_id=admin.id
-            )
-            db.session.add(notification)
+        notify_admins('New Item Request', f'New request "{item_request.title}" by {current_user.username}')
         
         db.session.commit()
         flash('Your request has been submitted successfully!', 'success')
@@ -236,9 +347,13 @@ def request_item():
     
     return render_template('request_item.html', form=form)
 
+@app.route('/media/<path:filename>')
+def media(filename):
+    return send_photo(filename)
+
 @app.route('/item/<int:id>')
 def item_detail(id):
-    donation = Donation.query.get_or_404(id)
+    donation = with_profile(Donation.query, 'donation_detail').get_or_404(id)
     
     # Check if user can view this donation
     if not current_user.is_authenticated:
@@ -251,7 +366,7 @@ def item_detail(id):
         return redirect(url_for('index'))
     
     # Get related items from same category
-    related_items = Donation.query.filter(
+    related_items = with_profile(Donation.query, 'donation_card').filter(
         and_(
             Donation.category_id == donation.category_id,
             Donation.id != donation.id,
@@ -261,6 +376,48 @@ def item_detail(id):
     
     return render_template('item_detail.html', donation=donation, related_items=related_items)
 
+@app.route('/api/donations')
+def api_donations():
+    query, relevance, count_key = browse_query(request.args)
+    per_page = api_per_page(request.args)
+    updated_at, approved_at = listing_versions()
+    etag = make_etag('donations', normalized_args(request.args), count_key, per_page, updated_at, approved_at)
+    
+    def build():
+        # Counted fresh: build() only runs when the ETag changed, and a cached total
+        # could outlive the tag it was sent with
+        total_count = query.order_by(None).count()
+        keys, descending = browse_sort_keys(request.args.get('sort'), relevance)
+        pagination = keyset_paginate(query, keys, request.args.get('cursor'), per_page, descending, total=total_count)
+        page_args = {k: v for k, v in request.args.items() if k != 'cursor'}
+        return {
+            'items': [donation_summary(donation) for donation in pagination.items],
+            'total': total_count,
+            'next': url_for('api_donations', cursor=pagination.next_cursor, **page_args) if pagination.has_next else None,
+            'prev': url_for('api_donations', cursor=pagination.prev_cursor, **page_args) if pagination.has_prev else None,
+        }
+    
+    return conditional_json(etag, last_modified(updated_at, approved_at), build)
+
+@app.route('/api/donations/<int:id>')
+def api_donation(id):
+    donation = db.session.get(Donation, id)
+    # Same visibility as the item page: approved items for everyone, others for their donor and admins
+    visible = donation is not None and (donation.status == 'approved' or (
+        current_user.is_authenticated and (current_user.is_admin or donation.donor_id == current_user.id)))
+    if not visible:
+        return jsonify({'error': 'Donation not found'}), 404
+    
+    etag = make_etag('donation', donation.id, donation.updated_at, donation.status, donation.approved_at,
+                     donation.donated_at, donation.photo_processed_at)
+    modified = last_modified(donation.updated_at, donation.created_at, donation.approved_at, donation.donated_at)
+    
+    def build():
+        detail = with_profile(Donation.query, 'donation_detail').filter(Donation.id == id).one()
+        return donation_detail(detail)
+    
+    return conditional_json(etag, modified, build, public=donation.status == 'approved')
+
 @app.route('/approve_donation/<int:id>', methods=['POST'])
 @login_required
 def approve_donation(id):
@@ -272,25 +429,11 @@ def approve_donation(id):
     form = ApprovalForm()
     
     if form.validate_on_submit():
-        donation.status = form.status.data
-        donation.approved_by_id = current_user.id
-        donation.approved_at = datetime.utcnow()
-        
-        db.session.commit()
-        
-        # Create notification for donor
-        notification = Notification(
-            title=f'Donation {form.status.data.title()}',
-            message=f'Your donation "{donation.title}" has been {form.status.data}.',
-            type='success' if form.status.data == 'approved' else 'warning',
-            user_id=donation.donor_id
-        )
-        db.session.add(notification)
-        db.session.commit()
-        
-        # If approved, check for potential matches
-        if form.status.data == 'approved':
-            check_for_matches(donation)
+        try:
+            review_donation(donation, form.status.data, current_user.id)
+        except WorkflowError as e:
+            flash(str(e), 'warning')
+            return redirect(url_for('admin_dashboard'))
         
         flash(f'Donation has been {form.status.data}.', 'success')
     
@@ -306,91 +449,11 @@ def create_match(donation_id, request_id):
     donation = Donation.query.get_or_404(donation_id)
     item_request = Request.query.get_or_404(request_id)
     
-    # Check if match already exists
-    existing_match = Match.query.filter_by(donation_id=donation_id, request_id=request_id).first()
-    if existing_match:
-        flash('Match already exists for these items.', 'warning')
+    try:
+        match_items(donation, item_request, current_user.id)
+    except WorkflowError as e:
+        flash(str(e), 'warning')
         return redirect(url_for('admin_dashboard'))
     
-    match = Match(
-        donation_id=donation_id,
-        request_id=request_id,
-        matched_by_id=current_user.id,
-        status='approved'
-    )
-    
-    # Update statuses
-    donation.status = 'donated'
-    donation.donated_at = datetime.utcnow()
-    item_request.status = 'fulfilled'
-    item_request.fulfilled_at = datetime.utcnow()
-    
-    db.session.add(match)
-    db.session.commit()
-    
-    # Send notifications
-    send_match_notification(donation, item_request, match)
-    
-    # Send thank you email to donor
-    if not donation.thank_you_sent:
-        send_thank_you_email(donation)
-        donation.thank_you_sent = True
-        db.session.commit()
-    
     flash('Match created successfully!', 'success')
     return redirect(url_for('admin_dashboard'))
-
-def check_for_matches(donation):
-    """Check for potential matches between approved donation and active requests"""
-    potential_requests = Request.query.filter_by(
-        category_id=donation.category_id,
-        status='active'
-    ).all()
-    
-    for req in potential_requests:
-        # Create notification for admin about potential match
-        admins = User.query.filter_by(is_admin=True).all()
-        for admin in admins:
-            notification = Notification(
-                title='Potential Match Found',
-                message=f'Donation "{donation.title}" may match request "{req.title}"',
-                type='info',
-                user_id=admin.id
-            )
-            db.session.add(notification)
-    
-    if potential_requests:
-        db.session.commit()
-
-# Initialize default categories and admin user
-def create_default_data():
-    # Create default categories
-    default_categories = [
-        {'name': 'Clothing', 'description': 'Clothes, shoes, accessories'},
-        {'name': 'Household Items', 'description': 'Furniture, kitchenware, decorations'},
-        {'name': 'Electronics', 'description': 'Phones, computers, appliances'},
-        {'name': 'Books & Media', 'description': 'Books, movies, games'},
-        {'name': 'Toys & Games', 'description': 'Children\'s toys and games'},
-        {'name': 'Personal Care', 'description': 'Hygiene products, cosmetics'},
-        {'name': 'Food & Supplies', 'description': 'Non-perishable food items'},
-        {'name': 'Other', 'description': 'Items that don\'t fit other categories'}
-    ]
-    
-    for cat_data in default_categories:
-        if not Category.query.filter_by(name=cat_data['name']).first():
-            category = Category(**cat_data)
-            db.session.add(category)
-    
-    # Create default admin user
-    if not User.query.filter_by(username='admin').first():
-        admin = User(
-            username='admin',
-            email='admin@sistershare.org',
-            is_admin=True
-        )
-        admin.set_password('admin123')  # Change this in production
-        db.session.add(admin)
-    
-    db.session.commit()
-
-# This will be called after database tables are created
@@ -0,0 +1,155 @@
+import re
+import click
+from sqlalchemy import Float, Integer, false, func, literal_column, or_, text
+from sqlalchemy.exc import OperationalError
+from app import app, db
+from models import Donation
+
+# Full-text search over donation titles and descriptions.
+# PostgreSQL: a generated tsvector column with a GIN index.
+# SQLite: an external-content FTS5 table kept in sync by triggers.
+# Anything else (or SQLite without FTS5) falls back to ILIKE scans.
+
+SEARCH_LANGUAGE = 'english'
+
+POSTGRES_DDL = [
+    f"""ALTER TABLE donation ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('{SEARCH_LANGUAGE}', coalesce(description, '')), 'B')
+        ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_donation_search_vector ON donation USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS donation_fts USING fts5(
+        title, description, content='donation', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS donation_fts_ai AFTER INSERT ON donation BEGIN
+        INSERT INTO donation_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS donation_fts_ad AFTER DELETE ON donation BEGIN
+        INSERT INTO donation_fts(donation_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS donation_fts_au AFTER UPDATE OF title, description ON donation BEGIN
+        INSERT INTO donation_fts(donation_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO donation_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+# Title matches weigh more than description matches in the SQLite ranking
+SQLITE_RANK = 'bm25(donation_fts, 10.0, 1.0)'
+
+_backend = None
+
+
+def ensure_search_index():
+    """Create the search index for the current database if it is missing; safe to call repeatedly"""
+    global _backend
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        with db.engine.begin() as conn:
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+        _backend = 'postgresql'
+    elif dialect == 'sqlite':
+        try:
+            with db.engine.begin() as conn:
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'donation_fts'")
+                ).first()
+                for statement in SQLITE_DDL:
+                    conn.execute(text(statement))
+                if not exists:
+                    # Index the donations that were written before the FTS table existed
+                    conn.execute(text("INSERT INTO donation_fts(donation_fts) VALUES ('rebuild')"))
+            _backend = 'sqlite'
+        except OperationalError as e:
+            app.logger.warning(f"SQLite FTS5 unavailable, search falls back to ILIKE: {str(e)}")
+            _backend = 'like'
+    else:
+        _backend = 'like'
+    return _backend
+
+
+def detect_search_backend():
+    """Work out which search backend the database supports, without changing it.
+
+    Requests only ever look; the index itself is created by `flask init-db` (or
+    `flask search-reindex`), so a worker never takes DDL locks mid-request. The
+    result is kept for the life of the process, so run init-db before starting workers.
+    """
+    global _backend
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        query = text(
+            "SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() "
+            "AND table_name = 'donation' AND column_name = 'search_vector'"
+        )
+        backend = 'postgresql'
+    elif dialect == 'sqlite':
+        query = text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'donation_fts'")
+        backend = 'sqlite'
+    else:
+        _backend = 'like'
+        return _backend
+    with db.engine.connect() as conn:
+        found = conn.execute(query).first() is not None
+    if not found:
+        app.logger.warning("Search index missing, search falls back to ILIKE; run 'flask init-db' to create it")
+        backend = 'like'
+    _backend = backend
+    return _backend
+
+
+def fts5_query(term):
+    """Turn free text into an FTS5 query that ANDs each word as a quoted prefix"""
+    words = re.findall(r'\w+', term)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def apply_search(query, term):
+    """Filter a Donation query by search term; returns (query, relevance score or None), higher is better"""
+    backend = _backend or detect_search_backend()
+
+    if backend == 'postgresql':
+        vector = literal_column('donation.search_vector')
+        ts_query = func.websearch_to_tsquery(SEARCH_LANGUAGE, term)
+        query = query.filter(vector.op('@@')(ts_query))
+        return query, func.ts_rank(vector, ts_query)
+
+    if backend == 'sqlite':
+        match = fts5_query(term)
+        if not match:
+            return query.filter(false()), None
+        # LIMIT -1 stops SQLite flattening the subquery into the join, which would
+        # re-run the MATCH once per approved donation instead of materializing it once
+        fts = text(
+            f"SELECT rowid AS donation_id, {SQLITE_RANK} AS rank FROM donation_fts WHERE donation_fts MATCH :match LIMIT -1"
+        ).bindparams(match=match).columns(donation_id=Integer, rank=Float).subquery('fts')
+        query = query.join(fts, fts.c.donation_id == Donation.id)
+        # bm25() scores are negative with lower meaning more relevant, so flip the sign
+        return query, -fts.c.rank
+
+    query = query.filter(
+        or_(
+            Donation.title.ilike(f'%{term}%'),
+            Donation.description.ilike(f'%{term}%')
+        )
+    )
+    return query, None
+
+
+@app.cli.command('search-reindex')
+def search_reindex():
+    """Create the donation search index and rebuild it from the donation table."""
+    backend = ensure_search_index()
+    if backend == 'sqlite':
+        with db.engine.begin() as conn:
+            conn.execute(text("INSERT INTO donation_fts(donation_fts) VALUES ('rebuild')"))
+    elif backend == 'postgresql':
+        with db.engine.begin() as conn:
+            conn.execute(text("REINDEX INDEX ix_donation_search_vector"))
+    click.echo(f"Search index ready ({backend})")
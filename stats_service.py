@@ -0,0 +1,100 @@
+import click
+from sqlalchemy import func, update
+from app import app, db
+from models import Donation, Request, Match, StatCounter
+
+# Dashboard totals live in the stat_counter table. Writers bump them with
+# relative UPDATEs inside their own transaction, so the dashboard reads a
+# handful of rows instead of counting whole tables.
+
+DONATION_STATUSES = ('pending', 'approved', 'donated', 'rejected')
+COUNTER_NAMES = (
+    ['donations_total']
+    + [f'donations_{status}' for status in DONATION_STATUSES]
+    + ['requests_active', 'matches_total']
+)
+
+
+def donation_status_counts():
+    """Donation counts per status in a single GROUP BY pass"""
+    return dict(db.session.query(Donation.status, func.count(Donation.id)).group_by(Donation.status).all())
+
+
+def compute_counters():
+    """Recount every counter from the source tables"""
+    by_status = donation_status_counts()
+    values = {'donations_total': sum(by_status.values())}
+    for status in DONATION_STATUSES:
+        values[f'donations_{status}'] = by_status.get(status, 0)
+    values['requests_active'] = db.session.query(func.count(Request.id)).filter(Request.status == 'active').scalar()
+    values['matches_total'] = db.session.query(func.count(Match.id)).scalar()
+    return values
+
+
+def rebuild_counters():
+    """Replace the stored counters with fresh counts; the caller commits"""
+    values = compute_counters()
+    existing = {counter.name: counter for counter in StatCounter.query.all()}
+    for name, value in values.items():
+        if name in existing:
+            existing[name].value = value
+        else:
+            db.session.add(StatCounter(name=name, value=value))
+    return values
+
+
+def ensure_counters():
+    """Seed the counters table the first time it is used"""
+    if db.session.query(func.count(StatCounter.name)).scalar() < len(COUNTER_NAMES):
+        rebuild_counters()
+        db.session.commit()
+
+
+def bump(**deltas):
+    """Adjust counters by the given deltas as part of the current transaction"""
+    for name, delta in deltas.items():
+        if delta:
+            db.session.execute(
+                update(StatCounter).where(StatCounter.name == name).values(value=StatCounter.value + delta)
+            )
+
+
+def record_donation_created(status='pending', count=1):
+    bump(donations_total=count, **{f'donations_{status}': count})
+
+
+def record_donation_status_change(old_status, new_status):
+    if old_status != new_status:
+        bump(**{f'donations_{old_status}': -1, f'donations_{new_status}': 1})
+
+
+def record_request_created(count=1):
+    bump(requests_active=count)
+
+
+def record_match_created(old_donation_status, old_request_status):
+    """A match moves the donation to donated and the request to fulfilled"""
+    record_donation_status_change(old_donation_status, 'donated')
+    bump(matches_total=1, requests_active=-1 if old_request_status == 'active' else 0)
+
+
+def get_dashboard_stats():
+    """Admin dashboard stats read from the maintained counters"""
+    counters = dict(db.session.query(StatCounter.name, StatCounter.value).all())
+    return {
+        'total_donations': counters.get('donations_total', 0),
+        'pending_donations': counters.get('donations_pending', 0),
+        'approved_donations': counters.get('donations_approved', 0),
+        'donated_items': counters.get('donations_donated', 0),
+        'active_requests': counters.get('requests_active', 0),
+        'total_matches': counters.get('matches_total', 0)
+    }
+
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recount the dashboard counters from the source tables."""
+    values = rebuild_counters()
+    db.session.commit()
+    for name, value in values.items():
+        click.echo(f"{name}: {value}")
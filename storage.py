@@ -0,0 +1,140 @@
+import hashlib
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from flask import current_app, send_from_directory, url_for
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+
+# Content-addressed photo storage. Uploads are streamed to a temp file while
+# being hashed and stored as <sha256><ext>, so identical photos are kept once
+# and a name never changes meaning, which lets clients cache them forever.
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # seconds
+
+# Matches stored originals and renditions derived from them
+CONTENT_ADDRESSED_NAME = re.compile(r'^(?:[\w-]+/)?[0-9a-f]{64}(?:-\w+)?\.\w+$')
+
+
+def is_content_addressed(name):
+    return bool(CONTENT_ADDRESSED_NAME.match(name))
+
+
+class PhotoStorage(ABC):
+    """Interface for photo storage backends"""
+
+    @abstractmethod
+    def save(self, stream, original_filename):
+        """Store the bytes from stream; returns the name to keep in Donation.photo_filename"""
+
+    @abstractmethod
+    def exists(self, name):
+        """Whether a file with this name is stored"""
+
+    @abstractmethod
+    def open(self, name):
+        """Binary file object for reading a stored file"""
+
+    @abstractmethod
+    def put(self, name, data):
+        """Store bytes under a given name, e.g. a rendition derived from an upload"""
+
+    @abstractmethod
+    def url(self, name):
+        """URL clients use to fetch the file"""
+
+    @abstractmethod
+    def send(self, name):
+        """Response for a request to /media/<name>; remote backends may redirect"""
+
+
+class LocalPhotoStorage(PhotoStorage):
+    """Stores photos in a directory on the local filesystem (UPLOAD_FOLDER by default)"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, name):
+        path = safe_join(self.root, name)
+        if path is None:
+            raise FileNotFoundError(name)
+        return path
+
+    def save(self, stream, original_filename):
+        extension = os.path.splitext(secure_filename(original_filename or ''))[1].lower()
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            name = f'{digest.hexdigest()}{extension}'
+            if self.exists(name):
+                # Same bytes already stored; keep the existing copy
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, os.path.join(self.root, name))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    def exists(self, name):
+        return os.path.exists(self._path(name))
+
+    def open(self, name):
+        return open(self._path(name), 'rb')
+
+    def put(self, name, data):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def url(self, name):
+        return url_for('media', filename=name)
+
+    def send(self, name):
+        if is_content_addressed(name):
+            response = send_from_directory(self.root, name, max_age=IMMUTABLE_MAX_AGE)
+            response.cache_control.immutable = True
+            response.cache_control.public = True
+            return response
+        return send_from_directory(self.root, name)
+
+
+STORAGE_BACKENDS = {
+    'local': lambda app: LocalPhotoStorage(app.config['UPLOAD_FOLDER']),
+}
+
+
+def register_storage_backend(name, factory):
+    """Make a backend available to PHOTO_STORAGE_BACKEND; factory receives the Flask app"""
+    STORAGE_BACKENDS[name] = factory
+
+
+def get_photo_storage():
+    """Storage backend for the current app, created once per app"""
+    app = current_app._get_current_object()
+    storage = app.extensions.get('photo_storage')
+    if storage is None:
+        backend = app.config.get('PHOTO_STORAGE_BACKEND', 'local')
+        storage = app.extensions['photo_storage'] = STORAGE_BACKENDS[backend](app)
+    return storage
+
+
+def send_photo(filename):
+    """Serve a stored photo through the configured backend"""
+    return get_photo_storage().send(filename)
@@ -0,0 +1,182 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+import pytest
+
+# The app reads its configuration at import time, so point it at a scratch
+# database (and cheap password hashing) before anything imports it.
+_tmp = tempfile.mkdtemp(prefix='sister-share-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ['AUTO_INIT_DB'] = '1'
+os.environ['CACHE_BACKEND'] = 'null'
+os.environ['MAIL_DISPATCH_MODE'] = 'worker'
+os.environ['MAIL_SUPPRESS_SEND'] = '1'
+os.environ['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'password'
+DONATIONS = 30  # enough that one lazy load per card would blow any budget
+REQUESTS = 12
+MATCHES = 6
+# Rows are spread over many people: a lazy many-to-one load of a user already in
+# the session is served from the identity map, which would hide an N+1
+DONORS = 10
+REQUESTERS = 6
+ADMINS = 3
+
+
+@pytest.fixture(scope='session')
+def app():
+    from main import app as flask_app
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return flask_app
+
+
+@pytest.fixture(scope='session')
+def seeded(app):
+    """Donors, requesters and admins (test_donor_0, test_admin_0, ...) with donations, requests and matches"""
+    from app import db
+    from models import User, Category, Donation, Request, Match
+
+    with app.app_context():
+        def create_users(role, count, is_admin=False):
+            users = [User(username=f'test_{role}_{i}', email=f'{role}{i}@example.org', is_admin=is_admin)
+                     for i in range(count)]
+            for user in users:
+                user.set_password(PASSWORD)
+            db.session.add_all(users)
+            return users
+
+        donors = create_users('donor', DONORS)
+        requesters = create_users('requester', REQUESTERS)
+        admins = create_users('admin', ADMINS, is_admin=True)
+        db.session.flush()
+
+        category_ids = [category.id for category in Category.query.order_by(Category.id)]
+        now = datetime.utcnow()
+        donations = []
+        for i in range(DONATIONS):
+            status = ('approved', 'pending', 'donated')[i % 3]
+            donation = Donation(
+                title=f'Donation {i}', description=f'Gently used item number {i}', status=status,
+                donor_id=donors[i % DONORS].id, category_id=category_ids[i % len(category_ids)],
+                created_at=now - timedelta(days=i + 1),
+                approved_at=now - timedelta(days=i) if status != 'pending' else None,
+                approved_by_id=admins[i % ADMINS].id if status != 'pending' else None,
+            )
+            db.session.add(donation)
+            donations.append(donation)
+        requests = []
+        for i in range(REQUESTS):
+            item_request = Request(
+                title=f'Request {i}', description=f'Looking for item number {i}',
+                urgency=('urgent', 'high', 'normal')[i % 3], status='active',
+                requester_id=requesters[i % REQUESTERS].id, category_id=category_ids[i % len(category_ids)],
+            )
+            db.session.add(item_request)
+            requests.append(item_request)
+        db.session.flush()
+
+        donated = [donation for donation in donations if donation.status == 'donated']
+        for i, (donation, item_request) in enumerate(list(zip(donated, requests))[:MATCHES]):
+            db.session.add(Match(donation_id=donation.id, request_id=item_request.id,
+                                 matched_by_id=admins[i % ADMINS].id, status='approved'))
+        db.session.commit()
+        return {
+            'approved_donation_id': next(d.id for d in donations if d.status == 'approved'),
+            'donated_donation_id': donated[0].id,
+        }
+
+
+class StatementCounter:
+    """Counts statements sent through the engine while active"""
+
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def client_for(app, seeded):
+    """Return a function that signs a test client in as the given user (None for anonymous)"""
+    def make(username):
+        client = app.test_client()
+        if username:
+            # A fresh app context per request, as in a real worker
+            with app.app_context():
+                response = client.post('/login', data={'username': username, 'password': PASSWORD})
+            assert response.status_code == 302
+        return client
+    return make
+
+
+@pytest.fixture
+def count_statements(app):
+    """Return a function that GETs a path and returns (response, StatementCounter)"""
+    from sqlalchemy import event
+    from app import db
+
+    def run(client, path):
+        counter = StatementCounter()
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', counter)
+            try:
+                response = client.get(path)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', counter)
+        return response, counter
+    return run
+
+
+@pytest.fixture
+def send(app):
+    """Return a function that runs one request on a client in a fresh app context"""
+    def run(client, method, path, **kwargs):
+        with app.app_context():
+            return client.open(path, method=method, **kwargs)
+    return run
+
+
+@pytest.fixture
+def new_donation(app, seeded):
+    """Return a function that inserts a donation by test_donor_0 and returns its id"""
+    from app import db
+    from models import User, Category, Donation
+
+    def make(status='pending', **columns):
+        with app.app_context():
+            donor = User.query.filter_by(username='test_donor_0').one()
+            values = dict(
+                title='Fresh donation', description='Added for one test', status=status, donor_id=donor.id,
+                category_id=Category.query.order_by(Category.id).first().id,
+                approved_at=datetime.utcnow() if status != 'pending' else None,
+            )
+            donation = Donation(**dict(values, **columns))
+            db.session.add(donation)
+            db.session.commit()
+            return donation.id
+    return make
+
+
+@pytest.fixture
+def new_request(app, seeded):
+    """Return a function that inserts a request by test_requester_0 and returns its id"""
+    from app import db
+    from models import User, Category, Request
+
+    def make(status='active'):
+        with app.app_context():
+            requester = User.query.filter_by(username='test_requester_0').one()
+            item_request = Request(
+                title='Fresh request', description='Added for one test', status=status,
+                requester_id=requester.id, category_id=Category.query.order_by(Category.id).first().id,
+            )
+            db.session.add(item_request)
+            db.session.commit()
+            return item_request.id
+    return make
@@ -0,0 +1,20 @@
+LISTING = '/api/donations?per_page=50'
+
+
+def test_listing_revalidates_after_approval(client_for, send, new_donation):
+    donation_id = new_donation('pending')
+    client = client_for(None)
+
+    first = send(client, 'GET', LISTING)
+    assert first.status_code == 200
+    etag, total = first.headers['ETag'], first.get_json()['total']
+    assert send(client, 'GET', LISTING, headers={'If-None-Match': etag}).status_code == 304
+
+    admin = client_for('test_admin_0')
+    send(admin, 'POST', f'/approve_donation/{donation_id}', data={'status': 'approved'})
+
+    second = send(client, 'GET', LISTING, headers={'If-None-Match': etag})
+    assert second.status_code == 200
+    assert second.get_json()['total'] == total + 1
+    assert donation_id in [item['id'] for item in second.get_json()['items']]
+    assert send(client, 'GET', LISTING, headers={'If-None-Match': second.headers['ETag']}).status_code == 304
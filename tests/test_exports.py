@@ -0,0 +1,26 @@
+import csv
+import io
+import json
+
+
+def test_csv_export_quotes_formula_cells(client_for, send, new_donation):
+    donation_id = new_donation(title='=HYPERLINK("http://example.com","x")', description='-2+3')
+    admin = client_for('test_admin_0')
+
+    response = send(admin, 'GET', '/admin/export/donations.csv')
+
+    rows = {row['id']: row for row in csv.DictReader(io.StringIO(response.get_data(as_text=True)))}
+    row = rows[str(donation_id)]
+    assert row['title'] == '\'=HYPERLINK("http://example.com","x")'
+    assert row['description'] == "'-2+3"
+    assert row['donor'] == 'test_donor_0'
+
+
+def test_jsonl_export_keeps_values_as_entered(client_for, send, new_donation):
+    donation_id = new_donation(title='@SUM(A1)')
+    admin = client_for('test_admin_0')
+
+    response = send(admin, 'GET', '/admin/export/donations.jsonl')
+
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert next(row for row in rows if row['id'] == donation_id)['title'] == '@SUM(A1)'
@@ -0,0 +1,28 @@
+import base64
+import json
+import pytest
+
+
+def tampered_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+# Each decodes cleanly but carries values that do not fit the (approved_at, id) keys
+TAMPERED = [
+    {'d': 'next', 'k': [['v', 'abc'], ['v', 1]]},
+    {'d': 'next', 'k': [['dt', '2024-01-01T00:00:00'], ['v', 'abc']]},
+    {'d': 'prev', 'k': [['v', 1], ['v', True]]},
+    {'d': 'next', 'k': [['v', [1]], ['v', {'a': 1}]]},
+]
+
+
+@pytest.mark.parametrize('path', ['/browse', '/api/donations'])
+@pytest.mark.parametrize('payload', TAMPERED)
+def test_tampered_cursor_falls_back_to_first_page(client_for, send, path, payload):
+    client = client_for(None)
+    first_page = send(client, 'GET', path)
+
+    response = send(client, 'GET', path, query_string={'cursor': tampered_cursor(payload)})
+
+    assert response.status_code == 200
+    assert response.data == first_page.data
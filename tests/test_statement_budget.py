@@ -0,0 +1,32 @@
+import pytest
+
+# Upper bounds on SQL statements per page render, including loading the
+# signed-in user. The seeded data has more rows than any budget, so a template
+# that lazy-loads a relationship per card or row fails here; when a page
+# legitimately needs another query, raise its budget in the same change.
+
+BUDGETS = [
+    # (signed in as, path, max statements)
+    (None, '/', 3),
+    (None, '/browse', 2),
+    ('test_donor_0', '/', 4),
+    ('test_donor_0', '/browse', 3),
+    ('test_donor_0', '/donor_portal', 6),
+    ('test_admin_0', '/admin', 8),
+    (None, '/item/{approved_donation_id}', 4),
+    ('test_admin_0', '/item/{donated_donation_id}', 5),
+]
+
+
+@pytest.mark.parametrize('username,path,budget', BUDGETS)
+def test_statement_budget(client_for, count_statements, seeded, username, path, budget):
+    client = client_for(username)
+    path = path.format(**seeded)
+    count_statements(client, path)  # warm process-level caches (categories, matching index)
+
+    response, counter = count_statements(client, path)
+
+    assert response.status_code == 200
+    assert counter.count <= budget, (
+        f'{path} ran {counter.count} statements (budget {budget}):\n' + '\n'.join(counter.statements)
+    )
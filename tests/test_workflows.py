@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import update
+
+
+def flashed(client):
+    with client.session_transaction() as session:
+        return [message for _, message in session.get('_flashes', [])]
+
+
+@pytest.fixture
+def side_effects(app):
+    """Return a function that snapshots the rows a workflow writes besides its own"""
+    from app import db
+    from models import User, StatCounter, Notification, EmailOutbox, Match
+
+    def snapshot():
+        with app.app_context():
+            return {
+                'stat_counter': dict(db.session.query(StatCounter.name, StatCounter.value).all()),
+                'unread_notifications': dict(db.session.query(User.id, User.unread_notifications).all()),
+                'notifications': Notification.query.count(),
+                'outbox': EmailOutbox.query.count(),
+                'matches': Match.query.count(),
+            }
+    return snapshot
+
+
+def test_matching_a_donation_twice_is_refused(client_for, send, new_donation, new_request, side_effects):
+    donation_id = new_donation('approved')
+    first_request_id, second_request_id = new_request(), new_request()
+    admin = client_for('test_admin_0')
+    send(admin, 'POST', f'/create_match/{donation_id}/{first_request_id}')
+    assert 'Match created successfully!' in flashed(admin)
+    before = side_effects()
+
+    send(admin, 'POST', f'/create_match/{donation_id}/{second_request_id}')
+
+    assert 'This donation is no longer available for matching.' in flashed(admin)
+    assert side_effects() == before
+
+
+def test_matching_a_fulfilled_request_is_refused(app, client_for, send, new_donation, new_request, side_effects):
+    from app import db
+    from models import Donation
+    first_donation_id, second_donation_id = new_donation('approved'), new_donation('approved')
+    request_id = new_request()
+    admin = client_for('test_admin_0')
+    send(admin, 'POST', f'/create_match/{first_donation_id}/{request_id}')
+    before = side_effects()
+
+    send(admin, 'POST', f'/create_match/{second_donation_id}/{request_id}')
+
+    assert 'This request has already been fulfilled.' in flashed(admin)
+    assert side_effects() == before
+    with app.app_context():
+        # The donation claimed before the request was checked is released with the rollback
+        assert db.session.get(Donation, second_donation_id).status == 'approved'
+
+
+def test_review_of_a_donation_changed_underneath_is_refused(app, seeded, new_donation, side_effects):
+    from app import db
+    from models import Donation, User
+    from workflows import review_donation, WorkflowError
+    donation_id = new_donation('pending')
+
+    with app.app_context():
+        admin_id = User.query.filter_by(username='test_admin_0').one().id
+        stale = db.session.get(Donation, donation_id)
+        assert stale.status == 'pending'
+        # Another admin approves it from a different connection after this one loaded it
+        with db.engine.begin() as conn:
+            conn.execute(update(Donation).where(Donation.id == donation_id).values(status='approved'))
+        before = side_effects()
+
+        with pytest.raises(WorkflowError, match='changed by someone else'):
+            review_donation(stale, 'rejected', admin_id)
+
+    assert side_effects() == before
+    with app.app_context():
+        assert db.session.get(Donation, donation_id).status == 'approved'
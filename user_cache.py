@@ -0,0 +1,78 @@
+from flask import g
+from flask_login import UserMixin
+from sqlalchemy import event
+from app import app, db
+from models import User
+from cache import LRUCache
+
+# Flask-Login loads the signed-in user on every request. Most views only need
+# the id, username and admin flag, so those are cached per worker as a small
+# snapshot for USER_CACHE_TTL seconds. At most USER_CACHE_SIZE users are kept,
+# least recently seen evicted first. Anything else read from current_user
+# (email, relationships, ...) loads the full row once for that request.
+# Committed changes to a user drop their snapshot in this worker; other
+# workers see the change once the TTL expires.
+
+_snapshots = LRUCache(app.config['USER_CACHE_SIZE'])
+
+
+class SessionUser(UserMixin):
+    """Cached stand-in for the signed-in User"""
+
+    def __init__(self, id, username, is_admin):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+
+    @property
+    def user(self):
+        """The full User row, loaded at most once per request"""
+        if g.get('_session_user_row') is None:
+            g._session_user_row = db.session.get(User, self.id)
+        return g._session_user_row
+
+    def __getattr__(self, name):
+        # Only reached for attributes the snapshot does not carry
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __repr__(self):
+        return f'<SessionUser {self.username}>'
+
+
+def load_session_user(user_id):
+    """Snapshot for user_id from the cache, or from the database when missing or expired"""
+    snapshot = _snapshots.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    row = db.session.query(User.id, User.username, User.is_admin).filter(User.id == user_id).first()
+    if row is None:
+        forget_user(user_id)
+        return None
+    snapshot = SessionUser(*row)
+    _snapshots.set(user_id, snapshot, app.config['USER_CACHE_TTL'])
+    return snapshot
+
+
+def forget_user(user_id):
+    _snapshots.delete(user_id)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_user_changes(session, flush_context):
+    changed = {obj.id for obj in session.dirty | session.deleted if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault('users_changed', set()).update(changed)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _forget_after_commit(session):
+    for user_id in session.info.pop('users_changed', ()):
+        forget_user(user_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('users_changed', None)
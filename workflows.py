@@ -0,0 +1,122 @@
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import Donation, Request, Match
+from email_service import send_thank_you_email, send_match_notification
+from matching_engine import engine as match_engine
+from notification_service import notify_user, notify_potential_matches, DIGEST_TITLE_LIMIT
+from stats_service import record_donation_status_change, record_match_created
+from cache import invalidate as invalidate_pages
+
+# Admin workflows that change several rows at once. Each runs as a single
+# transaction: state changes are conditional UPDATEs on the status the admin
+# acted on, so when two admins race, the row lock makes the second UPDATE match
+# nothing and that action is refused instead of applied twice. Notifications
+# and queued emails are written in the same transaction, and in-process caches
+# are only touched after the commit succeeds.
+
+REVIEWABLE_STATUSES = ('pending', 'approved', 'rejected')
+
+
+class WorkflowError(Exception):
+    """The action no longer applies; the message is safe to show the admin"""
+
+
+def review_donation(donation, status, admin_id):
+    """Approve or reject a donation, notify the donor and, on approval, post the match digest"""
+    old_status = donation.status
+    if old_status not in REVIEWABLE_STATUSES:
+        raise WorkflowError(f'This donation has already been {old_status}.')
+
+    try:
+        result = db.session.execute(
+            update(Donation)
+            .where(Donation.id == donation.id, Donation.status == old_status)
+            .values(status=status, approved_by_id=admin_id, approved_at=datetime.utcnow())
+        )
+        if result.rowcount != 1:
+            raise WorkflowError('This donation was changed by someone else; please review it again.')
+        record_donation_status_change(old_status, status)
+
+        notify_user(
+            donation.donor_id,
+            f'Donation {status.title()}',
+            f'Your donation "{donation.title}" has been {status}.',
+            'success' if status == 'approved' else 'warning'
+        )
+        if status == 'approved':
+            post_match_digest(donation)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    invalidate_pages('index', 'browse')
+    if status == 'approved':
+        match_engine.add_donation(donation)
+    else:
+        match_engine.remove_donation(donation.id)
+
+
+def post_match_digest(donation):
+    """Notify admins of active requests the donation may match; the caller commits"""
+    ranked = match_engine.rank_requests_for_donation(donation)
+    if ranked:
+        # One digest notification per admin rather than one per request, best matches first
+        top_ids = [request_id for request_id, _ in ranked[:DIGEST_TITLE_LIMIT]]
+        titles = dict(db.session.query(Request.id, Request.title).filter(Request.id.in_(top_ids)).all())
+        notify_potential_matches(donation, [titles[i] for i in top_ids if i in titles], len(ranked))
+
+
+def match_items(donation, item_request, admin_id):
+    """Match an approved donation to an active request and queue the emails; returns the Match"""
+    now = datetime.utcnow()
+    try:
+        # Claim both rows; a concurrent match of either one leaves nothing to update
+        claimed = db.session.execute(
+            update(Donation)
+            .where(Donation.id == donation.id, Donation.status == 'approved')
+            .values(status='donated', donated_at=now)
+        ).rowcount
+        if claimed != 1:
+            raise WorkflowError('This donation is no longer available for matching.')
+        claimed = db.session.execute(
+            update(Request)
+            .where(Request.id == item_request.id, Request.status == 'active')
+            .values(status='fulfilled', fulfilled_at=now)
+        ).rowcount
+        if claimed != 1:
+            raise WorkflowError('This request has already been fulfilled.')
+
+        match = Match(
+            donation_id=donation.id,
+            request_id=item_request.id,
+            matched_by_id=admin_id,
+            status='approved'
+        )
+        db.session.add(match)
+        db.session.flush()
+        record_match_created('approved', 'active')
+
+        # Emails go to the outbox in this transaction, so they are sent only if the match commits
+        send_match_notification(donation, item_request, match)
+        thank_donor = db.session.execute(
+            update(Donation)
+            .where(Donation.id == donation.id, Donation.thank_you_sent.isnot(True))
+            .values(thank_you_sent=True)
+        ).rowcount
+        if thank_donor:
+            send_thank_you_email(donation)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise WorkflowError('Match already exists for these items.')
+    except Exception:
+        db.session.rollback()
+        raise
+
+    match_engine.remove_donation(donation.id)
+    match_engine.remove_request(item_request.id)
+    invalidate_pages('index', 'browse')
+    return match